@@ -6,34 +6,91 @@
 """
 from __future__ import annotations
 import sys
-import wave
 import time
-import numpy as np
-import sounddevice as sd
-import onnx_asr
+import importlib
+import importlib.util
 import threading
+import queue
+import contextvars
 import signal
+import atexit
 import json
+import struct
 import os
 import subprocess
 import shutil
-import shlex
-import httpx
+import socket
+import hashlib
+import random
+import functools
+import itertools
 import gi
 from dotenv import load_dotenv
 
 # Загружаем переменные из .env файла, если он существует
 load_dotenv()
 
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Callable, Optional, Protocol, Union, List
-from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Optional, Protocol, Union, List, get_args
+from dataclasses import dataclass, field, fields
 
 gi.require_version('Gtk', '3.0')
 gi.require_version('GtkLayerShell', '0.1')
 gi.require_version('Gdk', '3.0')
 from gi.repository import Gtk, GtkLayerShell, GLib, Gdk
 
+# Набор методов Gdk.Monitor зависит от версии GTK, но не меняется в рантайме
+_HAS_GET_MODEL = hasattr(Gdk.Monitor, 'get_model')
+_HAS_GET_MANUFACTURER = hasattr(Gdk.Monitor, 'get_manufacturer')
+_HAS_GET_CONNECTOR = hasattr(Gdk.Monitor, 'get_connector')
+
+# Значения GI-перечислений, нужные на горячем пути (каждое обращение Edge.X - поиск атрибута)
+_EDGE_TOP = GtkLayerShell.Edge.TOP
+_EDGE_RIGHT = GtkLayerShell.Edge.RIGHT
+_DRAG_EVENT_MASK = (Gdk.EventMask.BUTTON_PRESS_MASK |
+                    Gdk.EventMask.BUTTON_RELEASE_MASK |
+                    Gdk.EventMask.POINTER_MOTION_MASK)
+
+# Тяжёлые зависимости (numpy, PortAudio, ONNX Runtime, httpx) импортируются при первом
+# использовании внутри сервисов. Атрибуты модуля (fstt.np и т.д.) доступны через __getattr__.
+_LAZY_MODULES = {
+    'np': 'numpy',
+    'sd': 'sounddevice',
+    'onnx_asr': 'onnx_asr',
+    'httpx': 'httpx',
+}
+
+
+def __getattr__(name):
+    """Ленивый импорт тяжёлых модулей (PEP 562)"""
+    module_name = _LAZY_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name)
+    globals()[name] = module
+    return module
+
+
+# Необязательная зависимость orjson: кодирует и разбирает JSON в разы быстрее stdlib.
+# Без неё используется json с тем же компактным UTF-8 форматом
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj) -> bytes:
+        """Сериализует объект в компактный UTF-8 JSON"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    _json_loads = json.loads
+
 
 # ============================================================================
 # REDUX АРХИТЕКТУРА - УПРАВЛЕНИЕ СОСТОЯНИЕМ
@@ -48,7 +105,7 @@ class Phase(Enum):
     RESTARTING = "restarting"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class State:
     """
     Неизменяемое состояние приложения.
@@ -76,48 +133,88 @@ class State:
     rel_x: float = 0.5  # Относительная позиция центра (0.0 - 1.0)
     rel_y: float = 0.1  # Относительная позиция центра (0.0 - 1.0)
 
+    # Хеш сохраняемых настроек (вычисляется автоматически, см. _settings_hash)
+    settings_hash: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'settings_hash', _settings_hash(self))
+
+
+def _settings_hash(state: State) -> int:
+    """Хеш подмножества State, которое сохраняется в settings.json"""
+    return hash((
+        state.llm_enabled,
+        state.auto_paste,
+        state.copy_method,
+        state.smart_text_processing,
+        state.smart_short_phrase_words
+    ))
+
+
+# Имена полей State (вычисляются один раз)
+_STATE_FIELDS = tuple(f.name for f in fields(State))
+
+
+def _replace_state(state: State, **changes) -> State:
+    """
+    Быстрый аналог dataclasses.replace для State.
+
+    Создаёт экземпляр напрямую через __new__, минуя сгенерированный __init__.
+    """
+    new_state = State.__new__(State)
+    for name in _STATE_FIELDS:
+        object.__setattr__(new_state, name, changes[name] if name in changes else getattr(state, name))
+    return new_state
+
+
+def _replace_settings(state: State, **changes) -> State:
+    """_replace_state для изменений настроек: пересчитывает settings_hash"""
+    new_state = _replace_state(state, **changes)
+    object.__setattr__(new_state, 'settings_hash', _settings_hash(new_state))
+    return new_state
+
 
 # --- UI события ---
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UIStart:
     """Пользователь нажал кнопку старт/запись"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UIStop:
     """Пользователь нажал кнопку стоп"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UIRestart:
     """Пользователь нажал кнопку перезапуска во время записи"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UIToggleLLM:
     """Пользователь переключил LLM пост-обработку"""
     pass
 
 
 # --- Результаты async операций ---
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ASRDone:
     """ASR (распознавание речи) завершено"""
     text: Optional[str]
     error: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LLMDone:
     """LLM пост-обработка завершена"""
     text: Optional[str]
     error: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RestartDone:
     """Перезапуск записи завершён"""
     success: bool
@@ -125,7 +222,7 @@ class RestartDone:
 
 
 # --- Системные события ---
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MonitorChanged:
     """Конфигурация монитора изменилась или окно перемещено на новый монитор"""
     monitor_name: Optional[str]
@@ -133,7 +230,7 @@ class MonitorChanged:
     rel_y: Optional[float] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WindowPositionChanged:
     """Относительная позиция окна изменилась"""
     rel_x: float
@@ -141,7 +238,9 @@ class WindowPositionChanged:
     is_manual: bool = False
 
 
-# Union тип для всех действий
+# Union тип для всех действий.
+# Классы действий финальные (не наследуются): reducer и эффекты сравнивают type(action)
+# по идентичности, поэтому подкласс действия не будет обработан.
 Action = Union[
     UIStart, UIStop, UIRestart, UIToggleLLM,
     ASRDone, LLMDone, RestartDone,
@@ -165,7 +264,7 @@ class Reducer:
         if state.phase != Phase.IDLE:
             return state
 
-        return replace(
+        return _replace_state(
             state,
             phase=Phase.RECORDING,
             error=None,
@@ -179,7 +278,7 @@ class Reducer:
         if state.phase != Phase.RECORDING:
             return state
 
-        return replace(state, phase=Phase.PROCESSING, error=None)
+        return _replace_state(state, phase=Phase.PROCESSING, error=None)
 
     @staticmethod
     def handle_ui_restart(state: State, action: UIRestart) -> State:
@@ -187,12 +286,12 @@ class Reducer:
         if state.phase != Phase.RECORDING:
             return state
 
-        return replace(state, phase=Phase.RESTARTING, error=None)
+        return _replace_state(state, phase=Phase.RESTARTING, error=None)
 
     @staticmethod
     def handle_ui_toggle_llm(state: State, action: UIToggleLLM) -> State:
         """Пользователь переключил LLM обработку"""
-        return replace(state, llm_enabled=not state.llm_enabled)
+        return _replace_settings(state, llm_enabled=not state.llm_enabled)
 
     @staticmethod
     def handle_asr_done(state: State, action: ASRDone) -> State:
@@ -203,7 +302,7 @@ class Reducer:
 
         # Обрабатываем ошибку или пустой текст
         if action.error or not action.text:
-            return replace(
+            return _replace_state(
                 state,
                 phase=Phase.IDLE,
                 error=action.error or "empty asr",
@@ -211,7 +310,7 @@ class Reducer:
             )
 
         # Успех - определяем следующую фазу на основе настройки LLM
-        return replace(
+        return _replace_state(
             state,
             recognized_text=action.text,
             phase=Phase.POST_PROCESSING if state.llm_enabled else Phase.IDLE,
@@ -228,7 +327,7 @@ class Reducer:
         # Обрабатываем ошибку или пустой текст
         if action.error or not action.text:
             # Можно вернуться к recognized_text, но пока просто ошибка
-            return replace(
+            return _replace_state(
                 state,
                 phase=Phase.IDLE,
                 error=action.error or "empty llm",
@@ -236,7 +335,7 @@ class Reducer:
             )
 
         # Успех
-        return replace(
+        return _replace_state(
             state,
             processed_text=action.text,
             phase=Phase.IDLE,
@@ -251,7 +350,7 @@ class Reducer:
             return state
 
         if action.success:
-            return replace(
+            return _replace_state(
                 state,
                 phase=Phase.RECORDING,
                 error=None,
@@ -259,7 +358,7 @@ class Reducer:
                 processed_text=None
             )
 
-        return replace(
+        return _replace_state(
             state,
             phase=Phase.IDLE,
             error=action.error or "restart failed"
@@ -269,23 +368,29 @@ class Reducer:
     def handle_monitor_changed(state: State, action: MonitorChanged) -> State:
         """Конфигурация монитора изменилась"""
         if action.monitor_name == state.current_monitor_name:
-            if action.rel_x is not None and action.rel_y is not None:
-                return replace(state, rel_x=action.rel_x, rel_y=action.rel_y)
-            return state
+            if action.rel_x is None or action.rel_y is None:
+                return state
+            # Повторное событие с теми же координатами (спурийный hotplug) - без изменений
+            if action.rel_x == state.rel_x and action.rel_y == state.rel_y:
+                return state
+            return _replace_state(state, rel_x=action.rel_x, rel_y=action.rel_y)
 
         # Если при смене монитора переданы координаты - применяем их сразу
         if action.rel_x is not None and action.rel_y is not None:
-            return replace(state,
-                           current_monitor_name=action.monitor_name,
-                           rel_x=action.rel_x,
-                           rel_y=action.rel_y)
+            return _replace_state(state,
+                                  current_monitor_name=action.monitor_name,
+                                  rel_x=action.rel_x,
+                                  rel_y=action.rel_y)
 
-        return replace(state, current_monitor_name=action.monitor_name)
+        return _replace_state(state, current_monitor_name=action.monitor_name)
 
     @staticmethod
     def handle_window_position_changed(state: State, action: WindowPositionChanged) -> State:
         """Позиция окна изменилась"""
-        return replace(
+        if action.rel_x == state.rel_x and action.rel_y == state.rel_y:
+            return state
+
+        return _replace_state(
             state,
             rel_x=action.rel_x,
             rel_y=action.rel_y
@@ -297,27 +402,26 @@ class Reducer:
         Главный dispatcher reducer'а.
 
         Перенаправляет действия соответствующим обработчикам и возвращает новое состояние.
+        Обработчик выбирается по точному типу действия через таблицу _REDUCER_TABLE.
         """
-        if isinstance(action, UIStart):
-            return Reducer.handle_ui_start(state, action)
-        elif isinstance(action, UIStop):
-            return Reducer.handle_ui_stop(state, action)
-        elif isinstance(action, UIRestart):
-            return Reducer.handle_ui_restart(state, action)
-        elif isinstance(action, UIToggleLLM):
-            return Reducer.handle_ui_toggle_llm(state, action)
-        elif isinstance(action, ASRDone):
-            return Reducer.handle_asr_done(state, action)
-        elif isinstance(action, LLMDone):
-            return Reducer.handle_llm_done(state, action)
-        elif isinstance(action, RestartDone):
-            return Reducer.handle_restart_done(state, action)
-        elif isinstance(action, MonitorChanged):
-            return Reducer.handle_monitor_changed(state, action)
-        elif isinstance(action, WindowPositionChanged):
-            return Reducer.handle_window_position_changed(state, action)
-
-        return state
+        handler = _REDUCER_TABLE.get(type(action))
+        if handler is None:
+            return state
+        return handler(state, action)
+
+
+# Таблица диспетчеризации reducer'а: тип действия -> обработчик
+_REDUCER_TABLE = {
+    UIStart: Reducer.handle_ui_start,
+    UIStop: Reducer.handle_ui_stop,
+    UIRestart: Reducer.handle_ui_restart,
+    UIToggleLLM: Reducer.handle_ui_toggle_llm,
+    ASRDone: Reducer.handle_asr_done,
+    LLMDone: Reducer.handle_llm_done,
+    RestartDone: Reducer.handle_restart_done,
+    MonitorChanged: Reducer.handle_monitor_changed,
+    WindowPositionChanged: Reducer.handle_window_position_changed,
+}
 
 
 class Store:
@@ -343,8 +447,19 @@ class Store:
         self._state = initial
         self._reducer = reducer
         self._effects = effects
-        self._subs = []
+        # Эффекты по типу действия: вызываются только заинтересованные (атрибут interests).
+        # Эффект без interests получает все действия.
+        self._effects_by_type = defaultdict(list)
+        for eff in effects:
+            for action_type in getattr(eff, 'interests', get_args(Action)):
+                self._effects_by_type[action_type].append(eff)
+        self._subs: dict[int, Callable[[State], None]] = {}
+        # Неизменяемый снимок подписчиков (copy-on-write): читается в dispatch без блокировки
+        self._subs_snapshot: tuple = ()
+        self._next_sub_id = 0
         self._lock = threading.Lock()
+        # Очередь уведомлений: хранит только последнее состояние (conflation)
+        self._pending = deque(maxlen=1)
 
     @property
     def state(self) -> State:
@@ -362,11 +477,23 @@ class Store:
         Returns:
             Функция отписки
         """
-        self._subs.append(fn)
+        with self._lock:
+            token = self._next_sub_id
+            self._next_sub_id += 1
+            self._subs[token] = fn
+            self._subs_snapshot = tuple(self._subs.values())
+            state = self._state
+
         # Сразу вызываем с текущим состоянием
-        fn(self._state)
+        fn(state)
+
+        def unsubscribe():
+            with self._lock:
+                if self._subs.pop(token, None) is not None:
+                    self._subs_snapshot = tuple(self._subs.values())
+
         # Возвращаем функцию отписки
-        return lambda: self._subs.remove(fn) if fn in self._subs else None
+        return unsubscribe
 
     def dispatch(self, action: Action) -> None:
         """
@@ -374,8 +501,11 @@ class Store:
 
         Это ЕДИНСТВЕННЫЙ способ изменить состояние. Поток выполнения:
         1. Запустить reducer для получения нового состояния (синхронно, чисто)
-        2. Уведомить подписчиков в главном потоке GTK
-        3. Запустить эффекты (могут отправить больше действий)
+        2. Запустить эффекты (могут отправить больше действий)
+        3. Уведомить подписчиков в главном потоке GTK
+
+        Эффекты запускаются до уведомления, поэтому каскад действий, отправленных
+        эффектами синхронно, доходит до подписчиков одним уведомлением с итоговым состоянием.
 
         Args:
             action: Действие для отправки
@@ -386,13 +516,40 @@ class Store:
             next_state = self._reducer(prev, action)
             self._state = next_state
 
-        # Шаг 2: Уведомить подписчиков в главном потоке GTK
-        for fn in list(self._subs):
-            GLib.idle_add(fn, next_state)
+            # Поставить состояние в очередь уведомлений.
+            # Если состояние не изменилось - уведомлять не о чем.
+            # Один idle-callback на пачку dispatch'ей: планируем только когда очередь была пуста
+            schedule = False
+            if prev is not next_state:
+                schedule = not self._pending
+                self._pending.append(next_state)
+
+        # Шаг 2: Запустить эффекты (они могут отправить больше действий)
+        try:
+            for eff in self._effects_by_type.get(type(action), ()):
+                eff.handle(action, prev, next_state, self.dispatch)
+        finally:
+            # Шаг 3: Уведомить подписчиков в главном потоке GTK.
+            # В finally: если эффект упал, очередь уже непуста и следующие dispatch'и
+            # не запланируют уведомление сами - UI перестал бы обновляться
+            if schedule:
+                GLib.idle_add(self._flush_notifications)
+
+    def _flush_notifications(self) -> bool:
+        """
+        Уведомляет подписчиков последним состоянием (вызывается в главном потоке GTK).
+
+        Промежуточные состояния отбрасываются - подписчики видят только актуальное.
+        """
+        with self._lock:
+            if not self._pending:
+                return False
+            state = self._pending.pop()
 
-        # Шаг 3: Запустить эффекты (они могут отправить больше действий)
-        for eff in self._effects:
-            eff.handle(action, prev, next_state, self.dispatch)
+        for fn in self._subs_snapshot:
+            fn(state)
+
+        return False
 
 
 # ============================================================================
@@ -408,6 +565,8 @@ class StartRecordingEffect:
     При ошибке: Отправляет ASRDone с ошибкой
     """
 
+    interests = (UIStart,)
+
     def __init__(self, speech):
         """
         Args:
@@ -417,10 +576,12 @@ class StartRecordingEffect:
 
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка UIStart действия"""
-        if isinstance(action, UIStart) and prev.phase == Phase.IDLE and next.phase == Phase.RECORDING:
+        if type(action) is not UIStart:
+            return
+        if prev.phase == Phase.IDLE and next.phase == Phase.RECORDING:
             ok = self.speech.start()
             if not ok:
-                log("❌ Не удалось запустить запись")
+                log("❌ Не удалось запустить запись", level=ERROR)
                 dispatch(ASRDone(
                     text=None,
                     error="failed to start recording"
@@ -436,6 +597,8 @@ class ASREffect:
     Результат: Отправляет ASRDone с текстом или ошибкой
     """
 
+    interests = (UIStop,)
+
     def __init__(self, speech, async_runner):
         """
         Args:
@@ -447,21 +610,18 @@ class ASREffect:
 
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка UIStop действия"""
-        if isinstance(action, UIStop) and prev.phase == Phase.RECORDING and next.phase == Phase.PROCESSING:
+        if type(action) is not UIStop:
+            return
+        if prev.phase == Phase.RECORDING and next.phase == Phase.PROCESSING:
 
             def task():
                 try:
-                    text = self.speech.stop_and_recognize()
-                    return (text, None)
+                    return ASRDone(text=self.speech.stop_and_recognize())
                 except Exception as e:
-                    log(f"❌ Ошибка ASR: {e}")
-                    return (None, str(e))
+                    log(f"❌ Ошибка ASR: {e}", level=ERROR)
+                    return ASRDone(text=None, error=str(e))
 
-            def done(result):
-                text, err = result
-                dispatch(ASRDone(text=text, error=err))
-
-            self.async_runner.run_async(task, done)
+            self.async_runner.run_async(task, dispatch)
 
 
 class LLMEffect:
@@ -469,23 +629,27 @@ class LLMEffect:
     Выполняет LLM пост-обработку распознанного текста.
 
     Срабатывает на: ASRDone действие когда llm_enabled=True
-    Побочный эффект: Запуск post_processing.process() async
+    Побочный эффект: Запуск post_processing.process() async (или ответ из кеша)
     Результат: Отправляет LLMDone с обработанным текстом или ошибкой
     """
 
-    def __init__(self, post_processing, async_runner):
+    interests = (ASRDone,)
+
+    def __init__(self, post_processing, async_runner, cache: Optional[LLMCache] = None):
         """
         Args:
             post_processing: Реализация PostProcessingProtocol
             async_runner: Класс AsyncTaskRunner
+            cache: Кеш результатов LLM (None - без кеширования)
         """
         self.pp = post_processing
         self.async_runner = async_runner
+        self.cache = cache
 
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка ASRDone действия"""
         # Срабатываем только на ASRDone
-        if not isinstance(action, ASRDone):
+        if type(action) is not ASRDone:
             return
 
         # Только если LLM включён и есть текст
@@ -494,20 +658,29 @@ class LLMEffect:
         if not action.text:
             return
 
+        # Промпт входит в ключ кеша: ответы, полученные со старым промптом, не переиспользуются
+        prompt = self.pp.prompt
+
+        # Попадание в кеш - сетевой запрос не нужен
+        if self.cache is not None:
+            cached = self.cache.get(action.text, prompt)
+            if cached is not None:
+                log("⚡ LLM результат взят из кеша")
+                self.async_runner.run_later(0, lambda: dispatch(LLMDone(text=cached)))
+                return
 
         def task():
             try:
                 processed = self.pp.process(action.text)
-                return (processed, None)
+                # Не кешируем fallback на исходный текст (нет ключа API, ошибка сети)
+                if self.cache is not None and processed and processed != action.text:
+                    self.cache.put(action.text, prompt, processed)
+                return LLMDone(text=processed)
             except Exception as e:
-                log(f"❌ Ошибка LLM: {e}")
-                return (None, str(e))
-
-        def done(result):
-            text, err = result
-            dispatch(LLMDone(text=text, error=err))
+                log(f"❌ Ошибка LLM: {e}", level=ERROR)
+                return LLMDone(text=None, error=str(e))
 
-        self.async_runner.run_async(task, done)
+        self.async_runner.run_async(task, dispatch)
 
 
 class FinalizeEffect:
@@ -521,12 +694,17 @@ class FinalizeEffect:
     1. ASRDone когда llm_enabled=False (копирует распознанный текст)
     2. LLMDone (копирует обработанный текст, или fallback на распознанный)
 
+    Пока идёт LLM, распознанный текст уже лежит в буфере обмена (без вставки),
+    чтобы пользователь мог вставить его вручную, не дожидаясь сети.
+
     Побочные эффекты:
     - Применяет умную обработку текста
     - Копирует в clipboard/primary
     - Автовставка если включена
     """
 
+    interests = (ASRDone, LLMDone)
+
     def __init__(self, clipboard, paste, glib_module, config):
         """
         Args:
@@ -545,41 +723,60 @@ class FinalizeEffect:
         if not state.smart_text_processing:
             return text
 
-        words = len(text.split())
-        if words <= state.smart_short_phrase_words:
+        # Считаем слова только до порога: split с maxsplit не строит список всех слов
+        limit = state.smart_short_phrase_words
+        if len(text.split(None, limit)) <= limit:
             # Короткая фраза: lowercase, убрать точку в конце
             return text.lower().rstrip(".")
         else:
             # Длинная фраза: добавить перевод строки
-            return text + " \n"
+            return f"{text} \n"
 
-    def copy_paste(self, state: State, text: str) -> None:
-        """Копировать текст и опционально вставить"""
-        # Копировать в соответствующий буфер обмена
+    def _do_paste(self) -> bool:
+        """Выполняет отложенную вставку (callback для GLib.timeout_add)"""
+        try:
+            self.paste.paste()
+        except Exception as e:
+            log(f"❌ Ошибка авто-вставки: {e}", level=ERROR)
+        return self.GLib.SOURCE_REMOVE
+
+    def copy(self, state: State, text: str) -> None:
+        """Копировать текст в соответствующий буфер обмена"""
         if state.copy_method == "clipboard":
             self.clipboard.copy_standard(text)
         else:
             self.clipboard.copy_primary(text)
 
+    def copy_paste(self, state: State, text: str) -> None:
+        """Копировать текст и опционально вставить"""
+        self.copy(state, text)
+
         # Автовставка если включена
         if state.auto_paste:
             delay_ms = self.config.settings.PASTE_DELAY_MS
-            self.GLib.timeout_add(delay_ms, lambda: (self.paste.paste(), False)[1])
-            log(f"⌨️  Авто-вставка запланирована ({delay_ms}ms)")
+            # Приоритет выше перерисовки GTK - вставка не ждёт обновления интерфейса
+            self.GLib.timeout_add(delay_ms, self._do_paste, priority=self.GLib.PRIORITY_HIGH_IDLE)
+            log("⌨️  Авто-вставка запланирована (%dms)", delay_ms)
 
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка триггеров финализации"""
 
         # Случай 1: ASRDone + LLM выключен => финализировать распознанным текстом
-        if isinstance(action, ASRDone) and not next.llm_enabled:
+        if type(action) is ASRDone and not next.llm_enabled:
             if action.text and next.phase == Phase.IDLE:
                 log("✅ Финализация после ASR (без LLM)")
                 text = self.smart_process(next, action.text)
                 self.copy_paste(next, text)
             return
 
+        # Распознанный текст копируем сразу, LLMDone потом заменит его и выполнит вставку
+        if type(action) is ASRDone and next.phase == Phase.POST_PROCESSING:
+            log("📋 Распознанный текст скопирован до завершения LLM")
+            self.copy(next, self.smart_process(next, action.text))
+            return
+
         # Случай 2: LLMDone => финализировать обработанным текстом (или fallback)
-        if isinstance(action, LLMDone):
+        if type(action) is LLMDone:
             if next.phase == Phase.IDLE:
                 # Использовать обработанный текст если доступен, иначе fallback на распознанный
                 base = action.text or next.recognized_text
@@ -588,7 +785,7 @@ class FinalizeEffect:
                     text = self.smart_process(next, base)
                     self.copy_paste(next, text)
                 else:
-                    log("⚠️  Нет текста для финализации")
+                    log("⚠️  Нет текста для финализации", level=WARNING)
 
 
 class RestartEffect:
@@ -603,6 +800,8 @@ class RestartEffect:
     Результат: Отправляет RestartDone с успехом/ошибкой
     """
 
+    interests = (UIRestart,)
+
     def __init__(self, speech, async_runner, restart_delay_sec: float):
         """
         Args:
@@ -616,30 +815,41 @@ class RestartEffect:
 
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка UIRestart действия"""
-        if isinstance(action, UIRestart) and prev.phase == Phase.RECORDING and next.phase == Phase.RESTARTING:
+        if type(action) is not UIRestart:
+            return
+        if prev.phase == Phase.RECORDING and next.phase == Phase.RESTARTING:
             log("🔄 Перезапуск записи...")
 
-            def task():
+            def stop_task():
                 try:
                     # Остановка без распознавания
                     self.speech.stop()
-                    log(f"⏸️  Запись остановлена, ожидание {self.delay}s...")
-
-                    # Задержка
-                    time.sleep(self.delay)
+                    return None
+                except Exception as e:
+                    log(f"❌ Ошибка перезапуска: {e}", level=ERROR)
+                    return RestartDone(success=False, error=str(e))
 
+            def start_task():
+                try:
                     # Запуск снова
-                    ok = self.speech.start()
-                    return (ok, None)
+                    return RestartDone(success=self.speech.start())
                 except Exception as e:
-                    log(f"❌ Ошибка перезапуска: {e}")
-                    return (False, str(e))
-
-            def done(result):
-                ok, err = result
-                dispatch(RestartDone(success=ok, error=err))
+                    log(f"❌ Ошибка перезапуска: {e}", level=ERROR)
+                    return RestartDone(success=False, error=str(e))
+
+            def stopped(failure):
+                if failure is not None:
+                    dispatch(failure)
+                    return
+
+                # Задержка через таймер главного цикла - поток пула не удерживается
+                log("⏸️  Запись остановлена, ожидание %ss...", self.delay)
+                self.async_runner.run_later(
+                    int(self.delay * 1000),
+                    lambda: self.async_runner.run_async(start_task, dispatch)
+                )
 
-            self.async_runner.run_async(task, done)
+            self.async_runner.run_async(stop_task, stopped)
 
 
 class SettingsPersistenceEffect:
@@ -648,8 +858,17 @@ class SettingsPersistenceEffect:
 
     Срабатывает на: UIToggleLLM и другие actions, меняющие настройки
     Побочный эффект: Запись settings.json в ~/.config/float-speech-to-text/
+
+    Запись выполняется в фоновом потоке с задержкой SAVE_DEBOUNCE_SEC:
+    если за это время настройки снова изменились, пишется только последний вариант.
+    Несохранённые настройки дописываются при выходе (atexit).
+
+    interests не задан: эффект получает все действия, а изменение настроек
+    определяется сравнением settings_hash, поэтому новые действия не нужно регистрировать.
     """
 
+    SAVE_DEBOUNCE_SEC = 0.5
+
     def __init__(self, settings_file: str):
         """
         Args:
@@ -659,49 +878,109 @@ class SettingsPersistenceEffect:
         # Создаём директорию если не существует
         os.makedirs(os.path.dirname(settings_file), exist_ok=True)
 
+        self._last_payload: Optional[bytes] = None
+        self._pending: Optional[dict] = None
+        self._cond = threading.Condition()
+        # Одна запись за раз: фоновый поток и flush() при выходе пишут один и тот же .tmp
+        self._write_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
     def handle(self, action: Action, prev: State, next: State, dispatch: Callable) -> None:
         """Обработка изменений настроек"""
-        # Проверяем, изменились ли настройки
-        settings_changed = (
-            prev.llm_enabled != next.llm_enabled or
-            prev.auto_paste != next.auto_paste or
-            prev.copy_method != next.copy_method or
-            prev.smart_text_processing != next.smart_text_processing or
-            prev.smart_short_phrase_words != next.smart_short_phrase_words
-        )
-
-        if settings_changed:
+        # Проверяем, изменились ли настройки (одно сравнение хешей)
+        if prev.settings_hash != next.settings_hash:
             self._save_settings(next)
 
     def _save_settings(self, state: State) -> None:
-        """Сохраняет настройки в JSON файл"""
+        """Ставит настройки в очередь на запись (заменяя ещё не записанные)"""
+        settings = {
+            "llm_enabled": state.llm_enabled,
+            "auto_paste": state.auto_paste,
+            "copy_method": state.copy_method,
+            "smart_text_processing": state.smart_text_processing,
+            "smart_short_phrase_words": state.smart_short_phrase_words
+        }
+
+        with self._cond:
+            self._pending = settings
+            self._cond.notify()
+
+    def _take_pending(self) -> Optional[dict]:
+        """Забирает последние несохранённые настройки"""
+        with self._cond:
+            settings, self._pending = self._pending, None
+        return settings
+
+    def _writer_loop(self) -> None:
+        """Фоновый поток записи настроек"""
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+            # Debounce: серия переключений за это время даст одну запись
+            time.sleep(self.SAVE_DEBOUNCE_SEC)
+            self._write_pending()
+
+    def flush(self) -> None:
+        """Синхронно записывает отложенные настройки (при выходе из приложения)"""
+        self._write_pending()
+
+    def _write_pending(self) -> None:
+        """
+        Забирает и записывает последние настройки под блокировкой записи
+
+        Настройки забираются уже под блокировкой: flush() дожидается идущей записи,
+        а более старый вариант не может лечь на диск поверх более нового.
+        """
+        with self._write_lock:
+            settings = self._take_pending()
+            if settings is not None:
+                self._write_settings(settings)
+
+    def _write_settings(self, settings: dict) -> None:
+        """
+        Атомарно записывает настройки в JSON файл (пропускает запись, если содержимое не изменилось)
+
+        Вызывается только под _write_lock.
+        """
         try:
-            settings = {
-                "llm_enabled": state.llm_enabled,
-                "auto_paste": state.auto_paste,
-                "copy_method": state.copy_method,
-                "smart_text_processing": state.smart_text_processing,
-                "smart_short_phrase_words": state.smart_short_phrase_words
-            }
-
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
-
-            log(f"💾 Настройки сохранены в {self.settings_file}")
+            payload = _json_dumps(settings)
+            if payload == self._last_payload:
+                return
+
+            tmp = self.settings_file + '.tmp'
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.write(fd, payload)
+                # Данные на диске до rename: после сбоя останется старый или новый файл целиком
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp, self.settings_file)
+            self._last_payload = payload
+
+            log("💾 Настройки сохранены в %s", self.settings_file)
         except Exception as e:
-            log(f"❌ Ошибка сохранения настроек: {e}")
+            log(f"❌ Ошибка сохранения настроек: {e}", level=ERROR)
 
     @staticmethod
     def load_settings(settings_file: str) -> dict:
         """Загружает настройки из JSON файла"""
         try:
-            if os.path.exists(settings_file):
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                log(f"📂 Настройки загружены из {settings_file}")
-                return settings
+            # Файл маленький: читаем целиком одним вызовом
+            settings = _json_loads(Path(settings_file).read_bytes())
+            # json создаёт неинтернированные строки: интернируем, чтобы сравнение
+            # copy_method в FinalizeEffect сводилось к проверке указателей
+            if isinstance(settings.get('copy_method'), str):
+                settings['copy_method'] = sys.intern(settings['copy_method'])
+            log(f"📂 Настройки загружены из {settings_file}")
+            return settings
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            log(f"❌ Ошибка загрузки настроек: {e}")
+            log(f"❌ Ошибка загрузки настроек: {e}", level=ERROR)
 
         return {}
 
@@ -715,6 +994,8 @@ class WindowPersistenceEffect:
     2. WindowPositionChanged: Сохраняет новую позицию для текущего монитора
     """
 
+    interests = (WindowPositionChanged,)
+
     def __init__(self, monitor_manager, window_persistence, config):
         """
         Args:
@@ -730,35 +1011,125 @@ class WindowPersistenceEffect:
         """Обработка событий монитора и позиции"""
 
         # Сохраняем позицию только если она была изменена вручную (перетаскивание)
-        if isinstance(action, WindowPositionChanged) and action.is_manual:
+        if type(action) is WindowPositionChanged and action.is_manual:
             if next.current_monitor_name:
-                self.wp.save_position(
+                # Отложенная запись: серия перемещений сохраняется одной записью
+                self.wp.schedule_save(
                     next.current_monitor_name,
                     action.rel_x,
                     action.rel_y
                 )
-                self.wp.save_last_monitor(next.current_monitor_name)
 
 
 # ============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ============================================================================
 
-def log(message):
-    """Вывод отладочной информации в stderr"""
-    print(message, file=sys.stderr)
+# Уровни логирования
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LOG_LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+_LOG_LEVEL = _LOG_LEVELS.get(os.environ.get("FSTT_LOG_LEVEL", "INFO").upper(), INFO)
+
+
+# Пока работает главный цикл, сообщения из него копятся в буфере и пишутся в stderr
+# одним вызовом из idle; предупреждения и ошибки, сообщения фоновых потоков и всё,
+# что выводится до запуска или после остановки цикла, пишутся сразу
+_log_buffer: list[str] = []
+_log_flush_scheduled = False
+_log_buffering = False
+_log_lock = threading.Lock()
+
+
+def _flush_log() -> bool:
+    """Записывает накопленные сообщения в stderr"""
+    global _log_flush_scheduled
+    with _log_lock:
+        _log_flush_scheduled = False
+        if not _log_buffer:
+            return False
+        data = "\n".join(_log_buffer) + "\n"
+        _log_buffer.clear()
+    sys.stderr.write(data)
+    sys.stderr.flush()
+    return False
+
+
+atexit.register(_flush_log)
+
+
+def _set_log_buffering(enabled: bool) -> bool:
+    """Включает/выключает буферизацию лога; при выключении сбрасывает накопленное"""
+    global _log_buffering
+    _log_buffering = enabled
+    if not enabled:
+        _flush_log()
+    return False
+
+
+def log(message, *args, level=INFO):
+    """
+    Вывод отладочной информации в stderr
+
+    Аргументы подставляются в message через % только если сообщение будет выведено.
+    """
+    global _log_flush_scheduled
+    if level < _LOG_LEVEL:
+        return
+    if args:
+        message = message % args
+    with _log_lock:
+        _log_buffer.append(message)
+        schedule = not _log_flush_scheduled
+        _log_flush_scheduled = True
+    if level >= WARNING or not _log_buffering or threading.current_thread() is not threading.main_thread():
+        _flush_log()
+    elif schedule:
+        GLib.idle_add(_flush_log, priority=GLib.PRIORITY_LOW)
+
+
+def log_enabled_for(level: int) -> bool:
+    """Проверяет, будут ли выведены сообщения указанного уровня"""
+    return level >= _LOG_LEVEL
+
+
+
+# Каталог настроек приложения: путь разворачивается один раз при импорте
+_APP_CONFIG_DIR = Path("~/.config/float-speech-to-text").expanduser()
+
+# Промпт читается перед каждым запросом к LLM: правки файла подхватываются без перезапуска,
+# а неизменённый файл стоит одного stat
+_prompt_cache: dict[str, tuple[float, str]] = {}
+_prompt_missing: set[str] = set()  # Пути, об отсутствии которых уже сообщили
 
 
 def load_prompt_from_file(file_path: str, default_prompt: str) -> str:
-    """Загружает текст промпта из файла"""
+    """Загружает текст промпта из файла (перечитывает только при изменении mtime)"""
     try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        else:
-            log(f"⚠️  Файл с промптом не найден: {file_path}")
-    except Exception as e:
-        log(f"❌ Ошибка загрузки промпта из файла: {e}")
+        # stat нужен только для проверки свежести уже закешированного промпта
+        cached = _prompt_cache.get(file_path)
+        if cached is not None and cached[0] == os.stat(file_path).st_mtime:
+            return cached[1]
+        # Бинарный режим + явный decode: без построчной трансляции переводов строк
+        with open(file_path, 'rb') as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            content = f.read().decode('utf-8').strip()
+        _prompt_cache[file_path] = (mtime, content)
+        _prompt_missing.discard(file_path)
+        if cached is not None:
+            log(f"🔄 Промпт перечитан: {file_path}")
+        return content
+    except FileNotFoundError:
+        _prompt_cache.pop(file_path, None)
+        # Вызывается на каждый запрос - предупреждаем один раз
+        if file_path not in _prompt_missing:
+            _prompt_missing.add(file_path)
+            log(f"⚠️  Файл с промптом не найден: {file_path}", level=WARNING)
+    except (OSError, UnicodeDecodeError) as e:
+        log(f"❌ Ошибка загрузки промпта из файла: {e}", level=ERROR)
     return default_prompt
 
 
@@ -767,35 +1138,46 @@ def load_prompt_from_file(file_path: str, default_prompt: str) -> str:
 class MonitorManager:
     """Управление состоянием мониторов и относительным позиционированием окна"""
 
+    # Сколько ждать notify от "не готовых" мониторов, прежде чем сдаться
+    READY_TIMEOUT_MS = 3000
+
     def __init__(self, config: Optional[AppConfig] = None):
         self.config = config
-        self.display = None
         self.monitors_available = True
         self.on_stable_change = None
 
-        # Состояние ретраев для "не готовых" мониторов
-        self.retry_id = None
-        self.retry_count = 0
+        # Подписки на notify "не готовых" мониторов: (монитор, id обработчика)
+        self._pending_notify: list[tuple[Gdk.Monitor, int]] = []
+        # Крайний срок ожидания готовности (id таймера GLib); не сдвигается каждым notify
+        self._ready_timeout_id: Optional[int] = None
+
+        # Кеш идентификаторов мониторов (сбрасывается при monitor-added/monitor-removed)
+        self._identifier_cache: dict[int, str] = {}
+        self._name_to_monitor: dict[str, Gdk.Monitor] = {}
+        # Число мониторов; до start_monitoring (нет сигналов для инвалидации) не кешируется
+        self._n_monitors: Optional[int] = None
+
+    @functools.cached_property
+    def display(self) -> Optional[Gdk.Display]:
+        """Display по умолчанию; запрашивается у GDK один раз (start_monitoring может переопределить)"""
+        return Gdk.Display.get_default()
 
     def get_monitor_at_cursor(self) -> Optional[Gdk.Monitor]:
         """Возвращает монитор, на котором находится курсор мыши, или первый доступный"""
         if not self.display:
-            self.display = Gdk.Display.get_default()
-
-        if not self.display:
-            log("⚠️  Не удалось получить display")
+            log("⚠️  Не удалось получить display", level=WARNING)
             return None
 
         try:
             # Получаем устройство указателя
             seat = self.display.get_default_seat()
             if not seat:
-                log("⚠️  Не удалось получить seat, используем первый монитор")
+                log("⚠️  Не удалось получить seat, используем первый монитор", level=WARNING)
                 return self.get_first_monitor()
 
             pointer = seat.get_pointer()
             if not pointer:
-                log("⚠️  Не удалось получить pointer, используем первый монитор")
+                log("⚠️  Не удалось получить pointer, используем первый монитор", level=WARNING)
                 return self.get_first_monitor()
 
             # Получаем позицию курсора
@@ -805,26 +1187,30 @@ class MonitorManager:
             monitor = self.display.get_monitor_at_point(int(x), int(y))
 
             if monitor:
-                log(f"📺 Монитор с курсором: {self.get_monitor_identifier(monitor)}")
+                if log_enabled_for(DEBUG):
+                    log("📺 Монитор с курсором: %s", self.get_monitor_identifier(monitor), level=DEBUG)
                 return monitor
             else:
                 # Курсор не на мониторе (может быть между мониторами или монитор только включился)
-                log("⚠️  Курсор не на мониторе, используем первый доступный монитор")
+                log("⚠️  Курсор не на мониторе, используем первый доступный монитор", level=WARNING)
                 return self.get_first_monitor()
         except Exception as e:
-            log(f"⚠️  Ошибка определения монитора по курсору: {e}, используем первый монитор")
+            log(f"⚠️  Ошибка определения монитора по курсору: {e}, используем первый монитор", level=WARNING)
             return self.get_first_monitor()
 
+    def _monitor_count(self) -> int:
+        """Возвращает число мониторов из кеша, обновляемого по сигналам дисплея"""
+        if self._n_monitors is None:
+            return self.display.get_n_monitors()
+        return self._n_monitors
+
     def get_first_monitor(self) -> Optional[Gdk.Monitor]:
         """Возвращает первый доступный монитор"""
         if not self.display:
-            self.display = Gdk.Display.get_default()
-
-        if not self.display:
-            log("⚠️  Display не доступен в get_first_monitor")
+            log("⚠️  Display не доступен в get_first_monitor", level=WARNING)
             return None
 
-        n_monitors = self.display.get_n_monitors()
+        n_monitors = self._monitor_count()
         log(f"🔍 get_first_monitor: найдено {n_monitors} мониторов")
 
         if n_monitors > 0:
@@ -834,95 +1220,102 @@ class MonitorManager:
                 log(f"📺 Используется первый монитор: {model}")
                 return monitor
             else:
-                log("⚠️  Монитор с индексом 0 вернул None")
+                log("⚠️  Монитор с индексом 0 вернул None", level=WARNING)
         else:
-            log("⚠️  Нет доступных мониторов")
+            log("⚠️  Нет доступных мониторов", level=WARNING)
 
         return None
 
     def get_monitor_identifier(self, monitor: Gdk.Monitor) -> Optional[str]:
         """
-        Получает идентификатор монитора.
+        Получает идентификатор монитора (с кешированием).
         Возвращает None, если монитор еще не инициализирован (0x0 geometry и нет модели).
         """
         if not monitor:
             return None
 
-        # 1. Проверяем геометрию - если 0x0, то монитор скорее всего не готов
-        try:
-            geom = monitor.get_geometry()
-            if geom.width <= 1 or geom.height <= 1:
-                # Если размеры почти нулевые, проверяем модель. Если и её нет - монитор не готов.
-                if not hasattr(monitor, 'get_model') or not monitor.get_model():
-                    log(f"⚠️  Монитор имеет нулевую геометрию и нет модели - он не готов")
-                    return None
-        except Exception:
-            pass
+        name = self._identifier_cache.get(id(monitor))
+        if name is not None:
+            return name
 
-        # 2. Пробуем get_model()
-        try:
-            if hasattr(monitor, 'get_model'):
-                model = monitor.get_model()
-                if model:
-                    return model
-        except Exception:
-            pass
+        name = self._compute_monitor_identifier(monitor)
+        # Не готовые мониторы (None) не кешируем - они могут стать готовыми позже
+        if name is not None:
+            self._identifier_cache[id(monitor)] = name
+            self._name_to_monitor[name] = monitor
+        return name
 
-        # 3. Пробуем manufacturer + connector
-        try:
-            manufacturer = None
-            if hasattr(monitor, 'get_manufacturer'):
-                manufacturer = monitor.get_manufacturer()
-
-            connector = None
-            if hasattr(monitor, 'get_connector'):
-                connector = monitor.get_connector()
-
-            if manufacturer and connector:
-                return f"{manufacturer}_{connector}"
-            elif connector:
-                return connector
-            elif manufacturer:
-                return manufacturer
-        except Exception:
-            pass
+    def _rebuild_monitor_cache(self):
+        """Сбрасывает и заново заполняет кеш идентификаторов мониторов"""
+        self._identifier_cache.clear()
+        self._name_to_monitor.clear()
+
+        if not self.display:
+            return
+
+        if self._n_monitors is not None:
+            self._n_monitors = self.display.get_n_monitors()
+
+        for i in range(self._monitor_count()):
+            monitor = self.display.get_monitor(i)
+            if monitor:
+                self.get_monitor_identifier(monitor)
 
-        # 4. Fallback на геометрию
+    def _compute_monitor_identifier(self, monitor: Gdk.Monitor) -> Optional[str]:
+        """Вычисляет идентификатор монитора через GDK"""
+        # Геометрия: единственный вызов GDK, который может легитимно бросить исключение
         try:
             geom = monitor.get_geometry()
-            # Если дошли сюда с 0x0, все методы выше не сработали.
-            if geom.width <= 1 or geom.height <= 1:
-                return None
-            return f"Monitor_{geom.width}x{geom.height}_{geom.x}x{geom.y}"
         except Exception as e:
-            log(f"⚠️  Ошибка получения идентификатора монитора: {e}")
+            log(f"⚠️  Ошибка получения геометрии монитора: {e}", level=WARNING)
+            geom = None
+        geometry_empty = geom is None or geom.width <= 1 or geom.height <= 1
+
+        model = monitor.get_model() if _HAS_GET_MODEL else None
+
+        # 1. Если размеры почти нулевые и нет модели - монитор не готов
+        if geom is not None and geometry_empty and not model:
+            log(f"⚠️  Монитор имеет нулевую геометрию и нет модели - он не готов", level=WARNING)
             return None
 
+        # 2. Модель
+        if model:
+            return model
+
+        # 3. Manufacturer + connector
+        manufacturer = monitor.get_manufacturer() if _HAS_GET_MANUFACTURER else None
+        connector = monitor.get_connector() if _HAS_GET_CONNECTOR else None
+
+        if manufacturer and connector:
+            return f"{manufacturer}_{connector}"
+        elif connector:
+            return connector
+        elif manufacturer:
+            return manufacturer
+
+        # 4. Fallback на геометрию. Если дошли сюда с 0x0, все методы выше не сработали.
+        if geometry_empty:
+            return None
+        return f"Monitor_{geom.width}x{geom.height}_{geom.x}x{geom.y}"
+
     def get_monitor_by_name(self, monitor_name: str) -> Optional[Gdk.Monitor]:
         """Находит монитор по его имени/модели"""
-        if not self.display:
-            self.display = Gdk.Display.get_default()
+        monitor = self._name_to_monitor.get(monitor_name)
+        if monitor is not None:
+            return monitor
 
         if not self.display:
             return None
 
-        n_monitors = self.display.get_n_monitors()
-        for i in range(n_monitors):
-            monitor = self.display.get_monitor(i)
-            if monitor and self.get_monitor_identifier(monitor) == monitor_name:
-                return monitor
-
-        return None
+        # Промах кеша: перестраиваем его один раз
+        self._rebuild_monitor_cache()
+        return self._name_to_monitor.get(monitor_name)
 
-    def get_monitor_geometry(self, monitor: Gdk.Monitor) -> dict:
-        """Возвращает геометрию монитора (ширина, высота, позиция)"""
-        geometry = monitor.get_geometry()
-        return {
-            'x': geometry.x,
-            'y': geometry.y,
-            'width': geometry.width,
-            'height': geometry.height
-        }
+    def get_monitor_geometry(self, monitor: Gdk.Monitor) -> Gdk.Rectangle:
+        """Возвращает геометрию монитора (x, y, width, height) как Gdk.Rectangle"""
+        # Не кешируется: смена разрешения, масштаба или расположения существующего монитора
+        # приходит только через notify::geometry, а get_geometry() - дешёвое чтение поля
+        return monitor.get_geometry()
 
     def calculate_relative_position(
         self,
@@ -944,8 +1337,8 @@ class MonitorManager:
             (rel_center_x, rel_center_y): Относительные координаты центра окна от 0.0 до 1.0
         """
         geometry = self.get_monitor_geometry(monitor)
-        monitor_width = geometry['width']
-        monitor_height = geometry['height']
+        monitor_width = geometry.width
+        monitor_height = geometry.height
 
         # Вычисляем абсолютную позицию центра окна
         # margin_right - это расстояние от правого края монитора до правого края окна
@@ -965,7 +1358,7 @@ class MonitorManager:
         rel_center_x = max(0.0, min(1.0, rel_center_x))
         rel_center_y = max(0.0, min(1.0, rel_center_y))
 
-        log(f"🧮 Относительная позиция центра: ({rel_center_x:.3f}, {rel_center_y:.3f})")
+        log("🧮 Относительная позиция центра: (%.3f, %.3f)", rel_center_x, rel_center_y, level=DEBUG)
 
         return (rel_center_x, rel_center_y)
 
@@ -989,8 +1382,8 @@ class MonitorManager:
             (margin_right, margin_top): Абсолютные отступы для GtkLayerShell (TOP + RIGHT anchors)
         """
         geometry = self.get_monitor_geometry(monitor)
-        monitor_width = geometry['width']
-        monitor_height = geometry['height']
+        monitor_width = geometry.width
+        monitor_height = geometry.height
 
         # Вычисляем абсолютную позицию центра окна
         center_x_abs = rel_center_x * monitor_width
@@ -1019,6 +1412,7 @@ class MonitorManager:
         Колбэк on_stable_change будет вызван только когда монитор определен и готов.
         """
         self.display = display
+        self._n_monitors = display.get_n_monitors()
         self.on_stable_change = on_stable_change
 
         # Подписываемся на изменения конфигурации мониторов
@@ -1028,19 +1422,20 @@ class MonitorManager:
         log("👀 Мониторинг дисплеев запущен")
 
     def _handle_monitor_event(self, display, monitor=None):
-        """Внутренний обработчик событий монитора с логикой ретраев"""
+        """Внутренний обработчик событий монитора с ожиданием готовности мониторов"""
         log("📺 Обнаружено изменение конфигурации мониторов (MonitorManager)")
 
-        # Отменяем текущий ретрай если есть
-        if self.retry_id:
-            GLib.source_remove(self.retry_id)
-            self.retry_id = None
+        # Конфигурация изменилась - кешированные идентификаторы недействительны
+        self._rebuild_monitor_cache()
+
+        # Отменяем ожидание готовности, если оно было
+        self._cancel_pending_notify()
 
         if not self.check_monitors_available():
-            log("⚠️  Все мониторы отключены")
+            log("⚠️  Все мониторы отключены", level=WARNING)
+            self._cancel_ready_timeout()
             if self.on_stable_change:
                 self.on_stable_change(None)
-            self.retry_count = 0
             return
 
         # Пытаемся найти активный монитор
@@ -1050,29 +1445,61 @@ class MonitorManager:
             monitor_name = self.get_monitor_identifier(active_monitor)
             if monitor_name:
                 log(f"✅ Монитор готов: {monitor_name}")
-                self.retry_count = 0
+                self._cancel_ready_timeout()
                 if self.on_stable_change:
                     self.on_stable_change(active_monitor)
                 return
 
-        # Если мониторы есть, но не готовы - планируем ретрай
-        self._schedule_retry(display, monitor)
-
-    def _schedule_retry(self, display, monitor):
-        """Планирует повторную проверку мониторов"""
-        if self.retry_count < 15:  # 15 * 200ms = 3 сек
-            self.retry_count += 1
-            log(f"⏳ Мониторы не готовы. Повтор через 200мс (попытка {self.retry_count})")
-            self.retry_id = GLib.timeout_add(
-                200,
-                lambda: (self._handle_monitor_event(display, monitor), False)[1]
+        # Мониторы есть, но не готовы - ждём, пока GDK заполнит их свойства
+        self._wait_for_monitors(display)
+
+    def _wait_for_monitors(self, display):
+        """
+        Ждёт готовности мониторов по сигналу notify вместо опроса по таймеру
+
+        GDK сообщает об изменении геометрии/модели монитора через notify::*, поэтому
+        повторная проверка запускается один раз, когда свойства действительно изменились.
+        """
+        log("⏳ Мониторы не готовы, жду обновления их свойств")
+        for i in range(self._monitor_count()):
+            monitor = display.get_monitor(i)
+            if monitor:
+                handler_id = monitor.connect(
+                    "notify", lambda *_args: self._handle_monitor_event(display)
+                )
+                self._pending_notify.append((monitor, handler_id))
+
+        # Монитор может так и не прислать notify (или не получить модель) - тогда
+        # по истечении срока продолжаем с тем, что есть, как прежний ограниченный retry
+        if self._ready_timeout_id is None:
+            self._ready_timeout_id = GLib.timeout_add(
+                self.READY_TIMEOUT_MS, self._on_ready_timeout
             )
-        else:
-            log("⚠️  Не удалось найти готовый монитор после всех попыток")
-            self.retry_count = 0
-            # Если так и не нашли ничего за 3 секунды, уведомляем о потере
-            if self.on_stable_change:
-                self.on_stable_change(None)
+
+    def _on_ready_timeout(self) -> bool:
+        """Срок ожидания готовности истёк: отключаем notify и берём лучший доступный монитор"""
+        self._ready_timeout_id = None
+        self._cancel_pending_notify()
+        log(f"⚠️  Мониторы не стали готовы за {self.READY_TIMEOUT_MS} мс", level=WARNING)
+
+        monitor = self.find_active_monitor()
+        if monitor is not None and not self.get_monitor_identifier(monitor):
+            monitor = None
+        if self.on_stable_change:
+            self.on_stable_change(monitor)
+        return GLib.SOURCE_REMOVE
+
+    def _cancel_ready_timeout(self):
+        """Снимает таймер крайнего срока ожидания готовности"""
+        if self._ready_timeout_id is not None:
+            GLib.source_remove(self._ready_timeout_id)
+            self._ready_timeout_id = None
+
+    def _cancel_pending_notify(self):
+        """Отключает обработчики ожидания готовности мониторов"""
+        for monitor, handler_id in self._pending_notify:
+            monitor.disconnect(handler_id)
+        self._pending_notify.clear()
 
     def find_active_monitor(self) -> Optional[Gdk.Monitor]:
         """
@@ -1099,19 +1526,16 @@ class MonitorManager:
             # 3. Fallback: Первый попавшийся
             return self.get_first_monitor()
         except Exception as e:
-            log(f"❌ Ошибка при поиске монитора: {e}")
+            log(f"❌ Ошибка при поиске монитора: {e}", level=ERROR)
             return None
 
     def check_monitors_available(self) -> bool:
         """Проверяет наличие активных мониторов"""
-        if not self.display:
-            self.display = Gdk.Display.get_default()
-
         if not self.display:
             self.monitors_available = False
             return False
 
-        n_monitors = self.display.get_n_monitors()
+        n_monitors = self._monitor_count()
         self.monitors_available = n_monitors > 0
 
         log(f"📺 Доступно мониторов: {n_monitors}")
@@ -1168,22 +1592,32 @@ class SpeechProtocol(Protocol):
 class PostProcessingProtocol(Protocol):
     """Протокол для сервиса пост-обработки текста"""
 
+    prompt: str  # Системный промпт (входит в ключ кеша LLM)
+
     def process(self, text: str) -> str:
         """Обрабатывает текст с помощью LLM"""
         ...
 
+    def close(self) -> None:
+        """Освобождает сетевые ресурсы и прерывает текущий запрос"""
+        ...
+
 
 # ============================================================================
 # КОНФИГУРАЦИЯ И КОНСТАНТЫ
 # ============================================================================
 
+_TRUTHY_ENV = frozenset(("true", "1", "yes", "on"))
+
+@functools.lru_cache(maxsize=128)
 def get_env_bool(name: str, default: bool) -> bool:
     """Получает булево значение из переменной окружения"""
     val = os.environ.get(name)
     if val is None:
         return default
-    return val.lower() in ("true", "1", "yes", "on")
+    return val.lower() in _TRUTHY_ENV
 
+@functools.lru_cache(maxsize=128)
 def get_env_int(name: str, default: int) -> int:
     """Получает целое число из переменной окружения"""
     try:
@@ -1191,6 +1625,7 @@ def get_env_int(name: str, default: int) -> int:
     except (ValueError, TypeError):
         return default
 
+@functools.lru_cache(maxsize=128)
 def get_env_float(name: str, default: float) -> float:
     """Получает число с плавающей точкой из переменной окружения"""
     try:
@@ -1204,8 +1639,14 @@ class AudioConfig:
     CHANNELS = get_env_int("FSTT_WAV_CHANNELS", 1)
     DTYPE = 'int16'
     SAMPLE_WIDTH = 2
+    MAX_RECORD_SECONDS = get_env_int("FSTT_MAX_RECORD_SECONDS", 300)  # Ёмкость буфера записи
     MODEL_NAME = os.environ.get("FSTT_ONNX_ASR_MODEL", "gigaam-v3-e2e-rnnt")
+    # Квантование весов модели ("int8" - быстрее на CPU, пусто - исходные FP32 веса)
+    MODEL_QUANTIZATION = os.environ.get("FSTT_ONNX_ASR_QUANTIZATION") or None
+    ONNX_THREADS = get_env_int("FSTT_ONNX_THREADS", 0)  # Потоки внутри оператора ONNX Runtime (0 - половина ядер)
     WAV_FILE = "recording.wav"
+    SAVE_WAV = get_env_bool("FSTT_SAVE_WAV", False)  # Сохранять запись в WAV_FILE (для отладки)
+    WARMUP_SECONDS = 0.1  # Длина тишины для прогревочного распознавания при старте
 
 
 class UIConfig:
@@ -1222,6 +1663,17 @@ class UIConfig:
     BOX_SPACING = 5
     BOX_MARGIN = 10
     MOUSE_BUTTON_LEFT = 1
+    DRAG_THRESHOLD_PX = 4  # Смещение, после которого нажатие считается перетаскиванием
+    CLICK_COALESCE_SEC = 0.15  # Повторные нажатия одной кнопки внутри окна игнорируются (двойной клик)
+
+    # CSS классы кнопок (см. CSS_STYLES)
+    CSS_CLASS_CLOSE = "close-button"
+    CSS_CLASS_RESTART = "restart-button"
+    CSS_CLASS_RECORD = "record-button"
+    CSS_CLASS_PP = "autopaste-button"
+    MONITOR_DEBOUNCE_MS = 80  # Окно схлопывания серии событий смены монитора
+
+    _css_provider: Optional[Gtk.CssProvider] = None
 
     CSS_STYLES = b"""
 window {
@@ -1262,17 +1714,27 @@ button:disabled {
 }
 """
 
+    @classmethod
+    def get_css_provider(cls) -> Gtk.CssProvider:
+        """Возвращает CSS провайдер, разобранный из CSS_STYLES один раз за процесс"""
+        if cls._css_provider is None:
+            cls._css_provider = Gtk.CssProvider()
+            cls._css_provider.load_from_data(cls.CSS_STYLES)
+        return cls._css_provider
+
 
 class AppSettings:
     """Настройки поведения приложения"""
     APP_ID = 'com.example.voice_recognition'
-    COPY_METHOD = os.environ.get("FSTT_CLIPBOARD_COPY_METHOD", "clipboard")  # Варианты: "primary", "clipboard"
+    COPY_METHOD = sys.intern(os.environ.get("FSTT_CLIPBOARD_COPY_METHOD", "clipboard"))  # Варианты: "primary", "clipboard"
     AUTO_PASTE = get_env_bool("FSTT_CLIPBOARD_PASTE_ENABLED", True)
     LLM_ENABLED = get_env_bool("FSTT_LLM_ENABLED", True)
     LLM_PROMPT_FILE = os.environ.get("FSTT_LLM_PROMPT_FILE", "prompt.md")
     LLM_TEMPERATURE = get_env_float("FSTT_LLM_TEMPERATURE", 1.0)
     LLM_MAX_RETRIES = get_env_int("FSTT_LLM_MAX_RETRIES", 2)
     LLM_TIMEOUT_SEC = get_env_int("FSTT_LLM_TIMEOUT_SEC", 60)
+    LLM_MAX_BACKOFF_SEC = get_env_float("FSTT_LLM_MAX_BACKOFF_SEC", 5.0)  # Потолок паузы между повторами
+    LLM_CACHE_ENABLED = get_env_bool("FSTT_LLM_CACHE_ENABLED", False)  # Кешировать результаты LLM (~/.config/float-speech-to-text/llm_cache.json)
     SMART_TEXT_PROCESSING = get_env_bool("FSTT_POSTPROCESSING_ENABLED", False)  # Включает умную обработку текста (короткие/длинные фразы)
     SMART_TEXT_SHORT_PHRASE = get_env_int("FSTT_POSTPROCESSING_WORD_THRESHOLD", 3)  # Максимальное количество слов для постобработки обработки коротких фраз
 
@@ -1283,16 +1745,66 @@ class AppSettings:
 
     # Таймауты и задержки
     PASTE_DELAY_MS = get_env_int("FSTT_CLIPBOARD_PASTE_DELAY_MS", 200)
+    YDOTOOL_SOCKET = os.environ.get("FSTT_YDOTOOL_SOCKET", "")  # Сокет ydotoold для вставки без запуска wtype
     RESTART_DELAY_SEC = get_env_float("FSTT_RECORD_RESTART_DELAY_SEC", 0.1)
 
 
 class WindowPositionPersistence:
-    """Управление сохранением и загрузкой позиции окна для каждого монитора отдельно"""
+    """
+    Управление сохранением и загрузкой позиции окна для каждого монитора отдельно
+
+    Конфиг читается с диска один раз и хранится в памяти (_cache);
+    сохранение изменяет кеш и атомарно перезаписывает файл.
+    """
 
     CONFIG_FILE = os.path.expanduser("~/.config/voice-recognition-window.json")
+    CONFIG_DIR = os.path.dirname(CONFIG_FILE)
     DEFAULT_CENTER_X = 0.5  # Центр по горизонтали
     DEFAULT_CENTER_Y = 0.1  # 10% от верха
 
+    _cache: Optional[dict] = None
+    _dir_ensured = False
+
+    # Отложенное сохранение (debounce): последние аргументы и id таймера GLib
+    SAVE_DEBOUNCE_MS = 300
+    _pending_save_source: Optional[int] = None
+    _pending_args: Optional[tuple[str, float, float]] = None
+
+    @classmethod
+    def _ensure_loaded(cls) -> dict:
+        """
+        Загружает конфиг с диска при первом обращении и возвращает кеш
+
+        Единственная точка чтения файла: load_position и get_last_monitor
+        работают только с кешем, поэтому при старте файл разбирается один раз.
+        """
+        if cls._cache is None:
+            try:
+                # Файл крошечный: читаем целиком одним вызовом и разбираем в C
+                cls._cache = _json_loads(Path(cls.CONFIG_FILE).read_bytes())
+            except FileNotFoundError:
+                cls._cache = {}
+            except Exception as e:
+                log(f"⚠️  Ошибка загрузки конфига: {e}", level=WARNING)
+                cls._cache = {}
+        return cls._cache
+
+    @classmethod
+    def _flush(cls) -> None:
+        """Атомарно записывает кеш в файл конфига"""
+        # Директорию создаём один раз за сессию
+        if not cls._dir_ensured:
+            if cls.CONFIG_DIR:
+                os.makedirs(cls.CONFIG_DIR, exist_ok=True)
+            cls._dir_ensured = True
+
+        # Сериализуем до открытия файла: ошибка не оставит обрезанный .tmp
+        data = _json_dumps(cls._cache)
+        tmp = cls.CONFIG_FILE + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, cls.CONFIG_FILE)
+
     @classmethod
     def load_position(cls, monitor_name: str) -> tuple[float, float]:
         """
@@ -1304,100 +1816,64 @@ class WindowPositionPersistence:
         Returns:
             (center_x, center_y): Относительные координаты центра окна (0.0-1.0)
         """
-        try:
-            if os.path.exists(cls.CONFIG_FILE):
-                with open(cls.CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                    monitors = config.get('monitors', {})
-                    monitor_config = monitors.get(monitor_name, {})
-
-                    center_x = monitor_config.get('center_x', cls.DEFAULT_CENTER_X)
-                    center_y = monitor_config.get('center_y', cls.DEFAULT_CENTER_Y)
+        config = cls._ensure_loaded()
+        monitor_config = config.get('monitors', {}).get(monitor_name)
+        if monitor_config is not None:
+            center_x = monitor_config.get('center_x', cls.DEFAULT_CENTER_X)
+            center_y = monitor_config.get('center_y', cls.DEFAULT_CENTER_Y)
 
-                    log(f"📂 Загружена позиция для монитора {monitor_name}: center=({center_x:.3f}, {center_y:.3f})")
-                    return (center_x, center_y)
-        except Exception as e:
-            log(f"⚠️  Ошибка загрузки конфига: {e}")
+            log(f"📂 Загружена позиция для монитора {monitor_name}: center=({center_x:.3f}, {center_y:.3f})")
+            return (center_x, center_y)
 
         log(f"📂 Используется дефолтная позиция для монитора {monitor_name}")
         return (cls.DEFAULT_CENTER_X, cls.DEFAULT_CENTER_Y)
 
     @classmethod
-    def save_position(cls, monitor_name: str, center_x: float, center_y: float) -> None:
+    def schedule_save(cls, monitor_name: str, center_x: float, center_y: float) -> None:
         """
-        Сохраняет относительную позицию центра окна для указанного монитора
+        Планирует сохранение позиции и последнего монитора.
 
-        Args:
-            monitor_name: Имя/модель монитора
-            center_x, center_y: Относительные координаты центра окна (0.0-1.0)
+        Серия вызовов в пределах SAVE_DEBOUNCE_MS приводит к одной записи на диск
+        с последними переданными значениями.
         """
-        try:
-            config_dir = os.path.dirname(cls.CONFIG_FILE)
-            if config_dir and not os.path.exists(config_dir):
-                os.makedirs(config_dir)
-
-            # Загружаем существующий конфиг
-            config = {}
-            if os.path.exists(cls.CONFIG_FILE):
-                with open(cls.CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
+        cls._pending_args = (monitor_name, center_x, center_y)
+        if cls._pending_save_source is not None:
+            GLib.source_remove(cls._pending_save_source)
+        cls._pending_save_source = GLib.timeout_add(cls.SAVE_DEBOUNCE_MS, cls._do_save)
 
-            # Обновляем позицию для монитора
-            if 'monitors' not in config:
-                config['monitors'] = {}
-
-            config['monitors'][monitor_name] = {
-                'center_x': center_x,
-                'center_y': center_y
-            }
-
-            # Сохраняем
-            with open(cls.CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=2)
+    @classmethod
+    def _do_save(cls) -> bool:
+        """Выполняет отложенное сохранение (callback для GLib.timeout_add)"""
+        cls._pending_save_source = None
+        args, cls._pending_args = cls._pending_args, None
+        if args is None:
+            return GLib.SOURCE_REMOVE
+
+        monitor_name, center_x, center_y = args
+        try:
+            config = cls._ensure_loaded()
+            entry = {'center_x': center_x, 'center_y': center_y}
+            monitors = config.setdefault('monitors', {})
+            # Клик без фактического сдвига (или возврат на то же место) не пишет на диск
+            if monitors.get(monitor_name) == entry and config.get('last_monitor') == monitor_name:
+                return GLib.SOURCE_REMOVE
+            monitors[monitor_name] = entry
+            config['last_monitor'] = monitor_name
+            cls._flush()
 
             log(f"💾 Сохранена позиция для монитора {monitor_name}: center=({center_x:.3f}, {center_y:.3f})")
         except Exception as e:
-            log(f"⚠️  Ошибка сохранения конфига: {e}")
+            log(f"⚠️  Ошибка сохранения конфига: {e}", level=WARNING)
+
+        return GLib.SOURCE_REMOVE
 
     @classmethod
     def get_last_monitor(cls) -> Optional[str]:
         """Возвращает имя последнего активного монитора"""
-        try:
-            if os.path.exists(cls.CONFIG_FILE):
-                with open(cls.CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                    last_monitor = config.get('last_monitor')
-                    if last_monitor:
-                        log(f"📂 Последний монитор: {last_monitor}")
-                    return last_monitor
-        except Exception as e:
-            log(f"⚠️  Ошибка загрузки конфига: {e}")
-
-        return None
-
-    @classmethod
-    def save_last_monitor(cls, monitor_name: str) -> None:
-        """Сохраняет имя последнего активного монитора"""
-        try:
-            config_dir = os.path.dirname(cls.CONFIG_FILE)
-            if config_dir and not os.path.exists(config_dir):
-                os.makedirs(config_dir)
-
-            # Загружаем существующий конфиг
-            config = {}
-            if os.path.exists(cls.CONFIG_FILE):
-                with open(cls.CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-
-            config['last_monitor'] = monitor_name
-
-            # Сохраняем
-            with open(cls.CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=2)
-
-            log(f"💾 Сохранён последний монитор: {monitor_name}")
-        except Exception as e:
-            log(f"⚠️  Ошибка сохранения конфига: {e}")
+        last_monitor = cls._ensure_loaded().get('last_monitor')
+        if last_monitor:
+            log(f"📂 Последний монитор: {last_monitor}")
+        return last_monitor
 
     @classmethod
     def load(cls) -> tuple[int, int]:
@@ -1447,6 +1923,8 @@ class ServiceFactory:
     Поддерживает Dependency Injection через конструктор для легкой замены реализаций.
     """
 
+    __slots__ = ('clipboard_class', 'paste_class', 'speech_class', 'post_processing_class')
+
     def __init__(
         self,
         clipboard_class: type = None,
@@ -1463,47 +1941,20 @@ class ServiceFactory:
             speech_class: Класс для создания сервиса распознавания речи (по умолчанию SpeechService)
             post_processing_class: Класс для создания сервиса пост-обработки (по умолчанию PostProcessingService)
         """
-        # Используем отложенную инициализацию дефолтных классов, чтобы избежать circular dependencies
-        self._clipboard_class = clipboard_class
-        self._paste_class = paste_class
-        self._speech_class = speech_class
-        self._post_processing_class = post_processing_class
-
-    @property
-    def clipboard_class(self):
-        """Возвращает класс сервиса буфера обмена (ленивая инициализация)"""
-        if self._clipboard_class is None:
-            return ClipboardService
-        return self._clipboard_class
-
-    @property
-    def paste_class(self):
-        """Возвращает класс сервиса вставки (ленивая инициализация)"""
-        if self._paste_class is None:
-            return PasteService
-        return self._paste_class
-
-    @property
-    def speech_class(self):
-        """Возвращает класс сервиса распознавания речи (ленивая инициализация)"""
-        if self._speech_class is None:
-            return SpeechService
-        return self._speech_class
-
-    @property
-    def post_processing_class(self):
-        """Возвращает класс сервиса пост-обработки (ленивая инициализация)"""
-        if self._post_processing_class is None:
-            return PostProcessingService
-        return self._post_processing_class
+        # Классы по умолчанию подставляются при создании фабрики (к этому моменту модуль
+        # загружен целиком), а не проверяются в property при каждом create_*
+        self.clipboard_class = clipboard_class or ClipboardService
+        self.paste_class = paste_class or PasteService
+        self.speech_class = speech_class or SpeechService
+        self.post_processing_class = post_processing_class or PostProcessingService
 
     def create_clipboard(self) -> ClipboardProtocol:
         """Создаёт сервис буфера обмена"""
         return self.clipboard_class()
 
-    def create_paste(self, copy_method: str) -> PasteProtocol:
+    def create_paste(self, copy_method: str, ydotool_socket: str = "") -> PasteProtocol:
         """Создаёт сервис вставки текста"""
-        return self.paste_class(copy_method)
+        return self.paste_class(copy_method, ydotool_socket)
 
     def create_speech(self, config: 'AppConfig') -> SpeechProtocol:
         """Создаёт сервис распознавания речи"""
@@ -1517,7 +1968,7 @@ class ServiceFactory:
         """Создаёт все необходимые сервисы"""
         speech = self.create_speech(config)
         clipboard = self.create_clipboard()
-        paste = self.create_paste(config.settings.COPY_METHOD)
+        paste = self.create_paste(config.settings.COPY_METHOD, config.settings.YDOTOOL_SOCKET)
         post_processing = self.create_post_processing(config)
         return speech, clipboard, paste, post_processing
 
@@ -1529,6 +1980,17 @@ class ServiceFactory:
 class ClipboardService:
     """Сервис для работы с буфером обмена (clipboard и primary selection)"""
 
+    def __init__(self):
+        # Утилиту для primary selection выбираем один раз, а не ищем в PATH при каждом копировании
+        if shutil.which('wl-copy'):  # Wayland
+            self._primary_fn = self._copy_primary_wl
+        elif shutil.which('xsel'):  # X11
+            self._primary_fn = self._copy_primary_xsel
+        elif shutil.which('xclip'):  # X11
+            self._primary_fn = self._copy_primary_xclip
+        else:
+            self._primary_fn = self._copy_primary_fallback
+
     def copy_standard(self, text):
         """Копирует текст в стандартный буфер обмена (Ctrl+V)"""
         try:
@@ -1537,29 +1999,20 @@ class ClipboardService:
             log("📋 Скопировано в буфер обмена")
             return True
         except ImportError:
-            log("⚠️  pyclip не установлен, используйте: pip install pyclip")
-            log("⚠️  Или установите wl-clipboard для Wayland: sudo pacman -S wl-clipboard")
+            log("⚠️  pyclip не установлен, используйте: pip install pyclip", level=WARNING)
+            log("⚠️  Или установите wl-clipboard для Wayland: sudo pacman -S wl-clipboard", level=WARNING)
             return False
         except Exception as e:
-            log(f"❌ Ошибка копирования в буфер обмена: {e}")
+            log(f"❌ Ошибка копирования в буфер обмена: {e}", level=ERROR)
             return False
 
     def copy_primary(self, text):
         """Копирует текст в primary selection (средняя кнопка мыши)"""
-        # Пробуем wl-copy для Wayland
-        if shutil.which('wl-copy'):
-            return self._copy_primary_wl(text)
-
-        # Пробуем xsel для X11
-        if shutil.which('xsel'):
-            return self._copy_primary_xsel(text)
+        return self._primary_fn(text)
 
-        # Пробуем xclip для X11
-        if shutil.which('xclip'):
-            return self._copy_primary_xclip(text)
-
-        # Резервный вариант: GTK Clipboard API
-        log("⚠️  Системные команды не найдены, пробую GTK Clipboard API...")
+    def _copy_primary_fallback(self, text):
+        """Резервный вариант: GTK Clipboard API"""
+        log("⚠️  Системные команды не найдены, пробую GTK Clipboard API...", level=WARNING)
         log("💡 Установите wl-clipboard для Wayland: sudo pacman -S wl-clipboard")
         log("💡 Или установите xsel для X11: sudo pacman -S xsel")
         return self._copy_primary_gtk(text)
@@ -1567,19 +2020,25 @@ class ClipboardService:
     def _copy_primary_wl(self, text):
         """Копирует через wl-copy (Wayland)"""
         try:
-            escaped_text = shlex.quote(text)
-            subprocess.Popen(
-                f'printf %s {escaped_text} | wl-copy --primary &',
-                shell=True,
-                stdin=subprocess.DEVNULL,
+            # Текст передаём через stdin без shell; --type отключает определение MIME-типа.
+            # wl-copy сам уходит в фон обслуживать selection, поэтому communicate не блокирует
+            process = subprocess.Popen(
+                ['wl-copy', '--primary', '--type', 'text/plain;charset=utf-8'],
+                stdin=subprocess.PIPE,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 start_new_session=True
             )
-            log("🖱️  Скопировано в primary selection через wl-copy")
-            return True
+            process.communicate(input=text.encode('utf-8'))
+
+            if process.returncode == 0:
+                log("🖱️  Скопировано в primary selection через wl-copy")
+                return True
+            else:
+                log(f"⚠️  wl-copy вернул код {process.returncode}", level=WARNING)
+                return False
         except Exception as e:
-            log(f"❌ Ошибка при использовании wl-copy: {e}")
+            log(f"❌ Ошибка при использовании wl-copy: {e}", level=ERROR)
             return False
 
     def _copy_primary_xsel(self, text):
@@ -1588,18 +2047,18 @@ class ClipboardService:
             process = subprocess.Popen(
                 ['xsel', '--primary', '--input'],
                 stdin=subprocess.PIPE,
-                stderr=subprocess.PIPE
+                stderr=subprocess.DEVNULL
             )
-            stdout, stderr = process.communicate(input=text.encode('utf-8'))
+            process.communicate(input=text.encode('utf-8'))
 
             if process.returncode == 0:
                 log("🖱️  Скопировано в primary selection через xsel")
                 return True
             else:
-                log(f"⚠️  xsel вернул код {process.returncode}: {stderr.decode('utf-8', errors='ignore')}")
+                log(f"⚠️  xsel вернул код {process.returncode}", level=WARNING)
                 return False
         except Exception as e:
-            log(f"❌ Ошибка при использовании xsel: {e}")
+            log(f"❌ Ошибка при использовании xsel: {e}", level=ERROR)
             return False
 
     def _copy_primary_xclip(self, text):
@@ -1608,18 +2067,18 @@ class ClipboardService:
             process = subprocess.Popen(
                 ['xclip', '-selection', 'primary'],
                 stdin=subprocess.PIPE,
-                stderr=subprocess.PIPE
+                stderr=subprocess.DEVNULL
             )
-            stdout, stderr = process.communicate(input=text.encode('utf-8'))
+            process.communicate(input=text.encode('utf-8'))
 
             if process.returncode == 0:
                 log("🖱️  Скопировано в primary selection через xclip")
                 return True
             else:
-                log(f"⚠️  xclip вернул код {process.returncode}: {stderr.decode('utf-8', errors='ignore')}")
+                log(f"⚠️  xclip вернул код {process.returncode}", level=WARNING)
                 return False
         except Exception as e:
-            log(f"❌ Ошибка при использовании xclip: {e}")
+            log(f"❌ Ошибка при использовании xclip: {e}", level=ERROR)
             return False
 
     def _copy_primary_gtk(self, text):
@@ -1631,91 +2090,196 @@ class ClipboardService:
             log("🖱️  Скопировано в primary selection через GTK")
             return True
         except Exception as e:
-            log(f"❌ Ошибка копирования в primary selection через GTK: {e}")
+            log(f"❌ Ошибка копирования в primary selection через GTK: {e}", level=ERROR)
             return False
 
 
 class PasteService:
-    """Сервис для вставки текста через эмуляцию клавиатуры (wtype)"""
+    """
+    Сервис для вставки текста через эмуляцию клавиатуры
+
+    Если задан сокет ydotoold, аккорд отправляется в уже запущенный демон
+    (без fork+exec на каждую вставку); иначе и при ошибке сокета - через wtype.
+    """
 
-    def __init__(self, copy_method: str):
+    # Коды клавиш и типы событий из linux/input-event-codes.h
+    EV_SYN = 0
+    EV_KEY = 1
+    KEY_LEFTCTRL = 29
+    KEY_LEFTSHIFT = 42
+    KEY_V = 47
+    KEY_INSERT = 110
+
+    def __init__(self, copy_method: str, ydotool_socket: str = ""):
         """
         Инициализация сервиса вставки
 
         Args:
             copy_method: Метод копирования ("clipboard", "primary")
+            ydotool_socket: Путь к сокету ydotoold (пустая строка - не использовать)
         """
         self.copy_method = copy_method
+        self._wtype_path = shutil.which('wtype')
+        self._ydotool = self._connect_ydotool(ydotool_socket) if ydotool_socket else None
+
+        # argv для wtype собираем один раз
+        self._clipboard_argv = (self._wtype_path, '-M', 'ctrl', '-k', 'v', '-m', 'ctrl')
+        self._primary_argv = (self._wtype_path, '-M', 'shift', '-k', 'Insert', '-m', 'shift')
+
+        # Способ вставки выбираем при создании, а не на каждый вызов paste()
+        if copy_method == "primary":
+            self._paste_fn = self._paste_primary
+        else:
+            if copy_method != "clipboard":
+                log(f"⚠️  Неизвестный метод копирования: {copy_method}", level=WARNING)
+            self._paste_fn = self._paste_clipboard
+
+    @staticmethod
+    def _connect_ydotool(path: str) -> Optional[socket.socket]:
+        """Подключается к датаграммному сокету ydotoold"""
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.connect(path)
+            log(f"⌨️  Вставка через ydotoold ({path})")
+            return sock
+        except OSError as e:
+            log(f"⚠️  Не удалось подключиться к ydotoold ({path}): {e}, используется wtype", level=WARNING)
+            return None
+
+    def _send_chord(self, modifier: int, key: int) -> bool:
+        """Отправляет в ydotoold нажатие modifier+key (struct input_event с нулевым временем)"""
+        if self._ydotool is None:
+            return False
+
+        try:
+            for code, value in ((modifier, 1), (key, 1), (key, 0), (modifier, 0)):
+                self._ydotool.send(struct.pack('llHHi', 0, 0, self.EV_KEY, code, value))
+                self._ydotool.send(struct.pack('llHHi', 0, 0, self.EV_SYN, 0, 0))
+            return True
+        except OSError as e:
+            log(f"⚠️  ydotoold недоступен: {e}, переключаюсь на wtype", level=WARNING)
+            self._ydotool.close()
+            self._ydotool = None
+            return False
 
     def paste(self):
         """Эмулирует вставку текста в зависимости от настройки copy_method"""
-        if self.copy_method == "primary":
-            return self._paste_primary()
-        elif self.copy_method == "clipboard":
-            return self._paste_clipboard()
-        else:
-            log(f"⚠️  Неизвестный метод копирования: {self.copy_method}")
-            return self._paste_clipboard()
+        return self._paste_fn()
 
     def _paste_clipboard(self):
         """Эмулирует нажатие Ctrl+V для вставки из стандартного буфера обмена"""
-        if not shutil.which('wtype'):
-            log("⚠️  wtype не найден. Установите wtype: sudo pacman -S wtype")
+        if self._send_chord(self.KEY_LEFTCTRL, self.KEY_V):
+            log("⌨️  Выполнена вставка из clipboard (Ctrl+V) через ydotoold")
+            return True
+
+        if not self._wtype_path:
+            log("⚠️  wtype не найден. Установите wtype: sudo pacman -S wtype", level=WARNING)
             return False
 
         try:
-            # wtype -M ctrl -k v -m ctrl
-            subprocess.run(['wtype', '-M', 'ctrl', '-k', 'v', '-m', 'ctrl'], check=True)
-            log("⌨️  Выполнена вставка из clipboard (Ctrl+V) через wtype")
-            return True
-        except Exception as e:
-            log(f"❌ Ошибка при выполнении wtype: {e}")
+            result = subprocess.run(self._clipboard_argv, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            log(f"❌ Ошибка при выполнении wtype: {e}", level=ERROR)
             return False
 
+        if result.returncode:
+            log(f"❌ wtype вернул код {result.returncode}: {result.stderr.decode('utf-8', errors='ignore').strip()}", level=ERROR)
+            return False
+
+        log("⌨️  Выполнена вставка из clipboard (Ctrl+V) через wtype")
+        return True
+
     def _paste_primary(self):
         """Эмулирует нажатие Shift+Insert для вставки из primary selection"""
-        if not shutil.which('wtype'):
-            log("⚠️  wtype не найден. Установите wtype: sudo pacman -S wtype")
+        if self._send_chord(self.KEY_LEFTSHIFT, self.KEY_INSERT):
+            log("⌨️  Выполнена вставка из primary selection (Shift+Insert) через ydotoold")
+            return True
+
+        if not self._wtype_path:
+            log("⚠️  wtype не найден. Установите wtype: sudo pacman -S wtype", level=WARNING)
             return False
 
         try:
-            # wtype -M shift -k Insert -m shift
-            subprocess.run(['wtype', '-M', 'shift', '-k', 'Insert', '-m', 'shift'], check=True)
-            log("⌨️  Выполнена вставка из primary selection (Shift+Insert) через wtype")
-            return True
-        except Exception as e:
-            log(f"❌ Ошибка при выполнении wtype: {e}")
+            result = subprocess.run(self._primary_argv, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            log(f"❌ Ошибка при выполнении wtype: {e}", level=ERROR)
             return False
 
+        if result.returncode:
+            log(f"❌ wtype вернул код {result.returncode}: {result.stderr.decode('utf-8', errors='ignore').strip()}", level=ERROR)
+            return False
+
+        log("⌨️  Выполнена вставка из primary selection (Shift+Insert) через wtype")
+        return True
+
 
 class SpeechService:
     """Сервис для записи и распознавания речи"""
 
     def __init__(self, config):
+        import numpy as np
+
         self.config = config
-        self.recording = []
-        self.is_recording = False
         self.stream = None
         self.model = None
-        self._stream_lock = threading.Lock()
+
+        # Буфер записи выделяется один раз (single producer / single consumer):
+        # аудио-callback только копирует блок и публикует новый индекс записи,
+        # без блокировок и аллокаций в realtime-потоке.
+        # Каждая запись получает своё поколение: UI-поток меняет только _active_gen,
+        # callback публикует (поколение, индекс) одним присваиванием, поэтому блоки
+        # прошлой записи не могут сдвинуть индекс новой
+        audio = config.audio
+        self._capacity = audio.MAX_RECORD_SECONDS * audio.SAMPLE_RATE
+        self._buffer = np.empty((self._capacity, audio.CHANNELS), dtype=audio.DTYPE)
+        # Байтовое представление того же буфера: RawInputStream отдаёт сырой int16 PCM,
+        # который копируется без создания numpy-объектов в callback'е
+        self._buffer_bytes = memoryview(self._buffer).cast('B')
+        self._frame_bytes = audio.CHANNELS * audio.SAMPLE_WIDTH
+        self._generations = itertools.count(1)
+        self._active_gen = 0  # 0 - запись не идёт
+        self._cursor = (0, 0)  # (поколение, индекс записи)
+        self._overflow_gen = 0
+
+        # Отладочная запись WAV идёт в отдельном потоке через очередь на один элемент,
+        # чтобы распознавание не ждало диск
+        self._wav_queue: Optional[queue.Queue] = None
+        self._wav_queue_lock = threading.Lock()
 
         # Запускаем поток сразу при инициализации
         self._init_stream()
 
+        # Модель грузим в фоне, чтобы первое распознавание не ждало инициализацию ONNX
+        self._model_ready = threading.Event()
+        threading.Thread(target=self._preload_model, name="asr-preload", daemon=True).start()
+
     def _init_stream(self):
         """Инициализирует и запускает постоянно работающий поток"""
-        def callback(indata, _frames, time, status):
-            if status:
-                log(f"⚠️  Статус: {status}")
+        import sounddevice as sd
 
-            # Пишем ВСЕГДА, независимо от состояния
-            # Но добавляем только если запись активна
-            if self.is_recording:
-                with self._stream_lock:
-                    self.recording.append(indata.copy())
+        fb = self._frame_bytes
 
-        # Создаём и запускаем поток
-        self.stream = sd.InputStream(
+        def callback(indata, frames, time, status):
+            if status:
+                log(f"⚠️  Статус: {status}", level=WARNING)
+
+            # Поток пишет ВСЕГДА, но в буфер попадают только блоки активной записи
+            active = self._active_gen
+            if active:
+                gen, w = self._cursor
+                if gen != active:
+                    w = 0  # Первый блок новой записи
+                n = frames
+                if w + n <= self._capacity:
+                    self._buffer_bytes[w * fb:(w + n) * fb] = indata
+                else:
+                    n = self._capacity - w
+                    self._buffer_bytes[w * fb:(w + n) * fb] = memoryview(indata)[:n * fb]
+                    self._overflow_gen = active
+                self._cursor = (active, w + n)
+
+        # Создаём и запускаем поток (Raw: блоки приходят как буфер int16 без обёртки в ndarray)
+        self.stream = sd.RawInputStream(
             samplerate=self.config.audio.SAMPLE_RATE,
             channels=self.config.audio.CHANNELS,
             dtype=self.config.audio.DTYPE,
@@ -1724,6 +2288,11 @@ class SpeechService:
         self.stream.start()
         log("🎤 Аудио-поток инициализирован и прогрет")
 
+    @property
+    def is_recording(self) -> bool:
+        """Возвращает True, если идёт запись"""
+        return self._active_gen != 0
+
     def start(self):
         """Начинает запись аудио"""
         if self.is_recording:
@@ -1731,15 +2300,8 @@ class SpeechService:
 
         log("🎤 Начинаю запись...")
 
-        # Атомарная операция: сначала останавливаем запись, очищаем буфер, затем запускаем
-        # Это гарантирует, что callback не добавит старые данные в новый буфер
-        with self._stream_lock:
-            # Сначала сбрасываем флаг (на всякий случай)
-            self.is_recording = False
-            # Очищаем буфер от любых остатков
-            self.recording = []
-            # Только теперь включаем запись - буфер чист
-            self.is_recording = True
+        # Новое поколение: callback начнёт его с нулевого индекса
+        self._active_gen = next(self._generations)
 
         log("✅ Запись началась (поток уже был готов)")
         return True
@@ -1752,132 +2314,475 @@ class SpeechService:
         log("⏹️  Запись остановлена (без распознавания)")
 
         # НЕ закрываем поток! Он работает постоянно
-        # Атомарно останавливаем запись и очищаем буфер
-        with self._stream_lock:
-            self.is_recording = False
-            self.recording = []
+        self._active_gen = 0
 
     def stop_and_recognize(self):
-        """Останавливает запись и распознаёт речь"""
+        """
+        Останавливает запись и распознаёт речь
+
+        Блокирует на время распознавания: вызывается только из фонового потока
+        (ASREffect через AsyncTaskRunner.run_async), в UI-поток попадает лишь текст.
+        """
         if not self.is_recording:
             return None
 
         log("⏹️  Запись остановлена")
 
         # НЕ закрываем поток! Он работает постоянно
-        # Атомарно останавливаем запись и копируем буфер
-        with self._stream_lock:
-            self.is_recording = False
-            recording_copy = self.recording.copy()
-
-        if not recording_copy:
-            log("❌ Ничего не записано")
+        # Останавливаем запись и один раз читаем опубликованный callback'ом индекс
+        gen = self._active_gen
+        self._active_gen = 0
+        cursor_gen, written = self._cursor
+        if cursor_gen != gen:
+            written = 0  # callback не успел записать ни одного блока
+
+        if not written:
+            log("❌ Ничего не записано", level=ERROR)
             return None
 
-        # Объединяем все буферы
-        audio_data = np.concatenate(recording_copy, axis=0)
+        if self._overflow_gen == gen:
+            log(f"⚠️  Запись обрезана до {self.config.audio.MAX_RECORD_SECONDS} сек", level=WARNING)
+
+        # Срез непрерывного буфера без копирования: до следующего start()
+        # (возможен только из IDLE, после распознавания) его никто не перезапишет
+        audio_data = self._buffer[:written]
         duration = len(audio_data) / self.config.audio.SAMPLE_RATE
         log(f"✅ Записано {len(audio_data)} сэмплов ({duration:.2f} сек)")
 
-        # Сохраняем в WAV файл
-        self._save_wav(audio_data)
+        # WAV на диск пишется только для отладки - распознаём прямо из памяти
+        if self.config.audio.SAVE_WAV:
+            self._save_wav(audio_data)
 
         # Распознаём речь
-        return self._recognize()
+        return self._recognize(self._to_waveform(audio_data))
+
+    def _to_waveform(self, audio_data):
+        """Преобразует int16 запись (сэмплы x каналы) в моно float32 в диапазоне [-1, 1]"""
+        import numpy as np
+
+        if audio_data.shape[1] == 1:
+            mono = audio_data[:, 0]
+        else:
+            mono = audio_data.mean(axis=1)
+        return mono.astype(np.float32) / 32768.0
 
     def _save_wav(self, audio_data):
-        """Сохраняет аудио данные в WAV файл"""
-        log(f"💾 Сохраняю в {self.config.audio.WAV_FILE}...")
+        """Ставит аудио данные в очередь на запись в WAV файл (заменяя ещё не записанные)"""
+        # Снимок байтов берём сразу: буфер записи будет переиспользован
+        frames = audio_data.tobytes()
+
+        with self._wav_queue_lock:
+            if self._wav_queue is None:
+                self._wav_queue = queue.Queue(maxsize=1)
+                threading.Thread(target=self._wav_writer_loop, name="wav-writer", daemon=True).start()
+            try:
+                self._wav_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._wav_queue.put_nowait(frames)
+
+    def _wav_writer_loop(self):
+        """Фоновый поток записи WAV"""
+        while True:
+            frames = self._wav_queue.get()
+            try:
+                self._write_wav(frames)
+            except Exception as e:
+                log(f"❌ Ошибка сохранения WAV: {e}", level=ERROR)
+
+    def _write_wav(self, frames: bytes):
+        """Записывает PCM данные в WAV файл: 44-байтный заголовок и данные одним writev"""
+        audio = self.config.audio
+        log(f"💾 Сохраняю в {audio.WAV_FILE}...")
+
+        block_align = audio.CHANNELS * audio.SAMPLE_WIDTH
+        header = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + len(frames), b'WAVE',
+            b'fmt ', 16, 1, audio.CHANNELS, audio.SAMPLE_RATE,
+            audio.SAMPLE_RATE * block_align, block_align, audio.SAMPLE_WIDTH * 8,
+            b'data', len(frames)
+        )
 
-        with wave.open(self.config.audio.WAV_FILE, 'wb') as wf:
-            wf.setnchannels(self.config.audio.CHANNELS)
-            wf.setsampwidth(self.config.audio.SAMPLE_WIDTH)
-            wf.setframerate(self.config.audio.SAMPLE_RATE)
-            wf.writeframes(audio_data.tobytes())
+        fd = os.open(audio.WAV_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            written = os.writev(fd, [header, frames])
+            # Короткая запись на обычный файл маловероятна, но возможна - дописываем остаток
+            if written < len(header) + len(frames):
+                rest = memoryview(header + frames)[written:]
+                while rest:
+                    rest = rest[os.write(fd, rest):]
+        finally:
+            os.close(fd)
 
         log(f"✅ Файл сохранён")
 
-    def _recognize(self):
-        """Распознаёт речь из WAV файла"""
-        log(f"🧠 Загружаю модель {self.config.audio.MODEL_NAME}...")
+    def _load_model(self) -> bool:
+        """Загружает модель распознавания, если она ещё не загружена"""
+        if self.model:
+            return True
+
+        audio = self.config.audio
+        log(f"🧠 Загружаю модель {audio.MODEL_NAME} ({audio.MODEL_QUANTIZATION or 'fp32'})...")
 
         try:
-            if not self.model:
-                self.model = onnx_asr.load_model(self.config.audio.MODEL_NAME)
+            import onnx_asr
+            self.model = onnx_asr.load_model(
+                audio.MODEL_NAME,
+                quantization=audio.MODEL_QUANTIZATION,
+                sess_options=self._session_options()
+            )
+            return True
         except Exception as e:
-            log(f"❌ Ошибка загрузки модели: {e}")
+            log(f"❌ Ошибка загрузки модели: {e}", level=ERROR)
             log(f"💡 Модель загрузится автоматически при первом запуске")
+            return False
+
+    def _session_options(self):
+        """Настройки сессий ONNX Runtime: одно распознавание за раз, максимум оптимизаций графа"""
+        import onnxruntime as ort
+
+        threads = self.config.audio.ONNX_THREADS or max(1, (os.cpu_count() or 2) // 2)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        return options
+
+    def _preload_model(self):
+        """Фоновая загрузка и прогрев модели при старте приложения"""
+        try:
+            if self._load_model():
+                log("✅ Модель распознавания загружена")
+                self._warmup_model()
+        finally:
+            self._model_ready.set()
+
+    def _warmup_model(self):
+        """Прогоняет через модель короткую тишину, чтобы первое распознавание не платило за инициализацию ONNX Runtime"""
+        import numpy as np
+
+        audio = self.config.audio
+        silence = np.zeros(int(audio.SAMPLE_RATE * audio.WARMUP_SECONDS), dtype=np.float32)
+        try:
+            self.model.recognize(silence, sample_rate=audio.SAMPLE_RATE)
+            log("🔥 Модель прогрета", level=DEBUG)
+        except Exception as e:
+            log(f"⚠️  Не удалось прогреть модель: {e}", level=WARNING)
+
+    def _recognize(self, waveform):
+        """Распознаёт речь из аудио в памяти"""
+        # Дожидаемся фоновой загрузки; если она не удалась - пробуем ещё раз
+        self._model_ready.wait()
+        if not self._load_model():
             return None
 
         log("🔍 Распознаю речь...")
 
         try:
-            text = self.model.recognize(self.config.audio.WAV_FILE)
+            text = self.model.recognize(waveform, sample_rate=self.config.audio.SAMPLE_RATE)
             if text:
                 log(f"📝 Распознано: {text}")
             return text
         except Exception as e:
-            log(f"❌ Ошибка распознавания: {e}")
+            log(f"❌ Ошибка распознавания: {e}", level=ERROR)
             return None
 
 
 class PostProcessingService:
     """Сервис для пост-обработки текста с помощью LLM"""
 
+    DEFAULT_PROMPT = "You are a helpful assistant."
+
     def __init__(self, config: AppConfig):
         self.config = config
-        self.prompt = load_prompt_from_file(config.settings.LLM_PROMPT_FILE, "You are a helpful assistant.")
+        self._prompt_file = config.settings.LLM_PROMPT_FILE
+        self._client = None
+        self._closed = False  # После close() повторные попытки запроса не делаются
+
+        # Неизменная часть запроса собирается один раз; на каждую фразу добавляется только текст
+        settings = config.settings
+        self._url = f"{settings.OPENAI_BASE_URL.rstrip('/')}/chat/completions"
+        # Сообщение с промптом пересобирается только когда текст промпта изменился
+        self._prompt_message = {"role": "user", "content": self.prompt}
+        self._body_base = {
+            "model": settings.OPENAI_MODEL,
+            "temperature": settings.LLM_TEMPERATURE,
+        }
+        self._stream_supported = True  # Сбрасывается, если сервер явно не поддерживает stream=True
+
+    @property
+    def prompt(self) -> str:
+        """Текущий системный промпт (файл перечитывается только при изменении mtime)"""
+        return load_prompt_from_file(self._prompt_file, self.DEFAULT_PROMPT)
+
+    def _get_client(self):
+        """Возвращает общий HTTP клиент (keep-alive соединение переиспользуется между запросами)"""
+        if self._client is None:
+            import httpx
+
+            # Соединение держим между фразами (по умолчанию httpx закрывает его через 5 с простоя);
+            # HTTP/2 - только если установлен необязательный пакет h2
+            self._client = httpx.Client(
+                timeout=self.config.settings.LLM_TIMEOUT_SEC,
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300.0),
+                headers={
+                    "Authorization": f"Bearer {self.config.settings.OPENAI_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+            )
+            atexit.register(self.close)
+        return self._client
+
+    def close(self):
+        """
+        Закрывает HTTP клиент и его пул соединений
+
+        Вызывается и при выходе из приложения: запрос, который в этот момент идёт
+        в фоновом потоке, обрывается с ошибкой соединения и больше не повторяется.
+        """
+        self._closed = True
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Пауза перед повторной попыткой: экспоненциальный рост с джиттером
+
+        На 429 учитывается заголовок Retry-After (в секундах), если сервер его прислал.
+        """
+        max_backoff = self.config.settings.LLM_MAX_BACKOFF_SEC
+        response = getattr(error, 'response', None)
+        if response is not None and response.status_code == 429:
+            try:
+                return min(max_backoff, float(response.headers['Retry-After']))
+            except (KeyError, ValueError):
+                pass
+        return min(max_backoff, (2 ** attempt) * 0.1) * (0.5 + random.random())
+
+    def _request_json(self, url: str, body: dict) -> str:
+        """Обычный запрос: ждёт полный ответ модели"""
+        response = self._get_client().post(url, content=_json_dumps(body))
+        response.raise_for_status()
+        return self._parse_completion(response.content)
+
+    @staticmethod
+    def _parse_completion(content: bytes) -> str:
+        """Извлекает текст ответа из JSON тела chat/completions (пустой текст - ошибка)"""
+        result = _json_loads(content)
+        text = result["choices"][0]["message"]["content"].strip()
+        if not text:
+            raise ValueError("пустой ответ")
+        return text
+
+    def _request_stream(self, url: str, body: dict) -> str:
+        """
+        Потоковый запрос (SSE): текст собирается из дельт по мере генерации
+
+        Если сервер отклонил stream=True, запрос повторяется обычным. Насовсем
+        потоковый режим отключается, только если в ответе явно упомянут stream.
+        Сервер, проигнорировавший stream=True, отвечает обычным JSON - он разбирается
+        как в _request_json. Пустой ответ считается ошибкой, а не результатом.
+        """
+        started = time.monotonic()
+        parts = []
+        rejected = None
+        with self._get_client().stream("POST", url, content=_json_dumps({**body, "stream": True})) as response:
+            if response.status_code in (400, 404, 422):
+                rejected = (response.status_code, response.read().decode("utf-8", "replace"))
+            else:
+                response.raise_for_status()
+                if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                    return self._parse_completion(response.read())
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = _json_loads(data).get("choices")
+                    if not choices:
+                        continue
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if not parts:
+                            log("⏱️  Первый токен LLM через %.0f мс", (time.monotonic() - started) * 1000, level=DEBUG)
+                        parts.append(delta)
+
+        if rejected is not None:
+            status, detail = rejected
+            # Соединение потока уже закрыто: обычный запрос не держит два подключения из пула
+            if "stream" in detail.lower():
+                log(f"⚠️  Сервер не поддерживает потоковые ответы ({status}), переключаюсь на обычные запросы", level=WARNING)
+                self._stream_supported = False
+            else:
+                log(f"⚠️  Сервер отклонил потоковый запрос ({status}), повторяю обычным", level=WARNING)
+            return self._request_json(url, body)
+
+        text = "".join(parts).strip()
+        if not text:
+            raise ValueError("пустой ответ")
+        return text
 
     def process(self, text: str) -> str:
         """Отправляет текст в LLM и возвращает обработанный результат"""
+        import httpx
+
         if not self.config.settings.OPENAI_API_KEY:
-            log("⚠️  OPENAI_API_KEY не найден. Пост-обработка отключена.")
+            log("⚠️  OPENAI_API_KEY не найден. Пост-обработка отключена.", level=WARNING)
             return text
 
         log(f"🧠 Отправка текста в LLM (модель: {self.config.settings.OPENAI_MODEL})...")
 
+        prompt = self.prompt
+        if prompt != self._prompt_message["content"]:
+            self._prompt_message = {"role": "user", "content": prompt}
+
+        body = {
+            **self._body_base,
+            "messages": [
+                self._prompt_message,
+                {"role": "user", "content": f"<user_input>{text}</user_input>"},
+            ],
+        }
+
         for attempt in range(self.config.settings.LLM_MAX_RETRIES):
             try:
-                with httpx.Client(timeout=self.config.settings.LLM_TIMEOUT_SEC) as client:
-                    response = client.post(
-                        f"{self.config.settings.OPENAI_BASE_URL.rstrip('/')}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.config.settings.OPENAI_API_KEY}",
-                            "Content-Type": "application/json",
-                        },
-                        json={
-                            "model": self.config.settings.OPENAI_MODEL,
-                            "messages": [
-                                {"role": "user", "content": self.prompt},
-                                {"role": "user", "content": f"<user_input>{text}</user_input>"},
-                            ],
-                            "temperature": self.config.settings.LLM_TEMPERATURE,
-                        },
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-
-                    processed_text = result["choices"][0]["message"]["content"].strip()
-                    log(f"✅ LLM ({self.config.settings.OPENAI_MODEL}) обработал: {processed_text}")
-                    return processed_text
+                if self._stream_supported:
+                    processed_text = self._request_stream(self._url, body)
+                else:
+                    processed_text = self._request_json(self._url, body)
+                log(f"✅ LLM ({self.config.settings.OPENAI_MODEL}) обработал: {processed_text}")
+                return processed_text
 
             except (httpx.RequestError, httpx.HTTPStatusError) as e:
-                log(f"❌ Ошибка при обращении к LLM (попытка {attempt + 1}): {e}")
+                if self._closed:
+                    log("🛑 Запрос к LLM прерван: приложение завершается")
+                    return text
+                log(f"❌ Ошибка при обращении к LLM (попытка {attempt + 1}): {e}", level=ERROR)
                 if attempt < self.config.settings.LLM_MAX_RETRIES - 1:
-                    time.sleep(1)  # Пауза перед повторной попыткой
+                    time.sleep(self._retry_delay(attempt, e))  # Пауза перед повторной попыткой
                 continue
-            except (KeyError, IndexError) as e:
-                log(f"❌ Неожиданный формат ответа от LLM: {e}")
+            except (KeyError, IndexError, ValueError) as e:
+                log(f"❌ Неожиданный формат ответа от LLM: {e}", level=ERROR)
                 break  # Не повторяем при ошибках парсинга
             except Exception as e:
-                log(f"❌ Неизвестная ошибка при пост-обработке: {e}")
+                log(f"❌ Неизвестная ошибка при пост-обработке: {e}", level=ERROR)
                 break  # Не повторяем при других ошибках
 
         # Резервный вариант: возвращаем исходный текст
-        log("⚠️  Не удалось получить ответ от LLM после нескольких попыток.")
+        log("⚠️  Не удалось получить ответ от LLM после нескольких попыток.", level=WARNING)
         return text
 
 
+class LLMCache:
+    """
+    Кеш результатов LLM пост-обработки: LRU в памяти + JSON файл на диске с TTL.
+
+    Ключ - sha256 от модели, температуры, системного промпта и нормализованного текста,
+    поэтому повторно надиктованные фразы не требуют сетевого запроса, а правка
+    prompt.md или смена температуры не возвращает ответы, полученные со старыми настройками.
+    """
+
+    def __init__(self, cache_file: str, model_id: str, temperature: float,
+                 max_size: int = 512, ttl_sec: float = 7 * 24 * 3600):
+        """
+        Args:
+            cache_file: Путь к файлу кеша (JSON)
+            model_id: Идентификатор модели LLM (входит в ключ)
+            temperature: Температура генерации (входит в ключ)
+            max_size: Максимальное количество записей
+            ttl_sec: Время жизни записи в секундах
+        """
+        self.cache_file = cache_file
+        self.model_id = model_id
+        self.temperature = temperature
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Запись на диск идёт вне self._lock (get() вызывается из UI-потока).
+        # Версия снимка не даёт более старому снимку перезаписать более новый
+        self._version = 0
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def _key(self, text: str, prompt: str) -> str:
+        """Вычисляет ключ кеша для текста, обработанного с указанным системным промптом"""
+        normalized = text.strip().lower()
+        return hashlib.sha256(
+            f"{self.model_id}\0{self.temperature!r}\0{prompt}\0{normalized}".encode('utf-8')
+        ).hexdigest()
+
+    def get(self, text: str, prompt: str) -> Optional[str]:
+        """Возвращает закешированный результат или None"""
+        key = self._key(text, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > self.ttl_sec:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, text: str, prompt: str, value: str) -> None:
+        """Сохраняет результат в кеш и на диск"""
+        key = self._key(text, prompt)
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._version += 1
+            version = self._version
+            snapshot = dict(self._entries)
+        self._save(snapshot, version)
+
+    def _load(self) -> None:
+        """Загружает кеш из файла, отбрасывая устаревшие записи"""
+        try:
+            data = _json_loads(Path(self.cache_file).read_bytes())
+            now = time.time()
+            for key, (created, value) in data.items():
+                if now - created <= self.ttl_sec:
+                    self._entries[key] = (created, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            log(f"📂 Кеш LLM загружен: {len(self._entries)} записей")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log(f"⚠️  Ошибка загрузки кеша LLM: {e}", level=WARNING)
+
+    def _save(self, snapshot: dict, version: int) -> None:
+        """Атомарно записывает снимок кеша в файл (вызывается без self._lock)"""
+        with self._save_lock:
+            if version <= self._saved_version:
+                return  # Уже записан более новый снимок
+            self._write(snapshot)
+            self._saved_version = version
+
+    def _write(self, snapshot: dict) -> None:
+        """Записывает снимок кеша через временный файл и os.replace"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = self.cache_file + '.tmp'
+            # В кеше надиктованный текст: файл доступен только владельцу, как settings.json
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_json_dumps(snapshot))
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            log(f"⚠️  Ошибка сохранения кеша LLM: {e}", level=WARNING)
+
+
 
 
 class AsyncTaskRunner:
@@ -1886,12 +2791,44 @@ class AsyncTaskRunner:
     # Режим работы: True для синхронного выполнения (для тестов), False для асинхронного (продакшн)
     _sync_mode = False
 
+    # Общий пул потоков (создаётся при первой задаче). Одновременно живут максимум
+    # распознавание, LLM и вставка/перезапуск - больше потоков не нужно
+    _executor: Optional[ThreadPoolExecutor] = None
+    _max_workers = 4
+
+    # Готовые результаты копятся в очереди; idle-источник ставится только при переходе
+    # очереди из пустой в непустую, поэтому пачка результатов - одно пробуждение цикла
+    _results: deque = deque()
+    _results_lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """Возвращает общий пул потоков, создавая его при первом обращении"""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=cls._max_workers,
+                thread_name_prefix="async-task"
+            )
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        Останавливает пул потоков при выходе из приложения
 
+        Задачи из очереди отменяются, текущие не ожидаются. Потоки пула не daemon,
+        поэтому уже идущую задачу нужно прервать отдельно (см. PostProcessingService.close).
+        """
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
 
     @classmethod
     def run_async(cls, target: Callable, callback: Callable[[any], None]) -> None:
         """
-        Запускает задачу в отдельном потоке и возвращает результат в UI-поток
+        Запускает задачу в пуле потоков и возвращает результат в UI-поток
+
+        Контекст (contextvars) вызывающего потока копируется в задачу, как в asyncio.to_thread.
 
         Args:
             target: Функция для выполнения в фоновом потоке
@@ -1903,13 +2840,56 @@ class AsyncTaskRunner:
             callback(result)
         else:
             # Асинхронный режим для продакшна
-            def task():
-                result = target()
-                GLib.idle_add(callback, result)
+            ctx = contextvars.copy_context()
+            future = cls._get_executor().submit(ctx.run, target)
+            future.add_done_callback(lambda f: cls._deliver(f, callback))
+
+    @classmethod
+    def _deliver(cls, future, callback: Callable[[any], None]) -> None:
+        """Передаёт результат задачи в UI-поток; исключение логируется, а не теряется в Future"""
+        error = future.exception()
+        if error is not None:
+            log(f"❌ Ошибка в фоновой задаче: {error}", level=ERROR)
+            return
+        with cls._results_lock:
+            cls._results.append((callback, future.result()))
+            schedule = len(cls._results) == 1
+        if schedule:
+            GLib.idle_add(cls._drain)
+
+    @classmethod
+    def _drain(cls) -> bool:
+        """Вызывает в UI-потоке колбэки всех накопленных результатов"""
+        while True:
+            with cls._results_lock:
+                if not cls._results:
+                    return False
+                callback, result = cls._results.popleft()
+            # Ошибка одного колбэка не должна оставить остальные результаты в очереди:
+            # новый drain планируется только при переходе очереди из пустой в непустую
+            try:
+                callback(result)
+            except Exception as e:
+                log(f"❌ Ошибка в обработчике результата фоновой задачи: {e}", level=ERROR)
+
+    @classmethod
+    def run_later(cls, delay_ms: int, callback: Callable[[], None]) -> None:
+        """
+        Вызывает callback в UI-потоке через delay_ms, не занимая поток пула на время ожидания
+
+        Args:
+            delay_ms: Задержка в миллисекундах
+            callback: Функция для вызова в UI-потоке
+        """
+        if cls._sync_mode:
+            callback()
+            return
 
-            thread = threading.Thread(target=task)
-            thread.daemon = True
-            thread.start()
+        def fire() -> bool:
+            callback()
+            return GLib.SOURCE_REMOVE
+
+        GLib.timeout_add(delay_ms, fire)
 
 
 
@@ -1934,7 +2914,8 @@ class RecognitionWindow:
         self,
         config: AppConfig,
         store: Store,
-        monitor_manager: MonitorManager
+        monitor_manager: MonitorManager,
+        post_processing: Optional[PostProcessingProtocol] = None
     ):
         """
         Инициализирует окно с внедрёнными зависимостями
@@ -1943,10 +2924,15 @@ class RecognitionWindow:
             config: Конфигурация приложения
             store: Redux store для управления состоянием
             monitor_manager: Менеджер мониторов
+            post_processing: Сервис LLM (закрывается при выходе)
         """
         self.config = config
         self.store = store
         self.monitor_manager = monitor_manager
+        self.post_processing = post_processing
+        # UI-константы читаются в обработчиках мыши и render: один атрибут вместо цепочки
+        self._ui = config.ui
+        self._drag_threshold_sq = config.ui.DRAG_THRESHOLD_PX ** 2
 
         self.window = None
         self.button = None
@@ -1959,10 +2945,41 @@ class RecognitionWindow:
         self.drag_start_y = 0
         self.is_dragging = False
         self.was_moved = False
+        self._drag_armed = False  # Кнопка нажата, но порог перетаскивания ещё не пройден
 
         # Текущие отступы (кеш для отрисовки и плавного перетаскивания)
-        self.current_margin_x = 20
-        self.current_margin_y = 50
+        self.current_margin_x: int = 20
+        self.current_margin_y: int = 50
+
+        # Отступы при перетаскивании применяются не чаще раза за кадр (tick callback)
+        self._motion_tick_id: Optional[int] = None
+
+        # Время последнего принятого нажатия каждой кнопки (для подавления двойных кликов)
+        self._last_click: dict[str, float] = {}
+
+        # Последние применённые к кнопкам значения: повторные set_label/add_class не вызываются
+        self._record_button_ui: Optional[tuple] = None
+        self._restart_button_ui: Optional[tuple] = None
+        self._last_llm_enabled: Optional[bool] = None
+
+        # Вид кнопок для каждой фазы:
+        # (лейбл записи, запись активна, лейбл рестарта, это рестарт, рестарт активен)
+        ui = self._ui
+        self._phase_ui = {
+            Phase.IDLE: (ui.ICON_RECORD, True, ui.ICON_CLOSE, False, True),
+            Phase.RECORDING: (ui.ICON_STOP, True, ui.ICON_RESTART, True, True),
+            Phase.PROCESSING: (ui.ICON_PROCESSING, False, ui.ICON_CLOSE, False, False),
+            Phase.POST_PROCESSING: (ui.ICON_PROCESSING, False, ui.ICON_CLOSE, False, False),
+            Phase.RESTARTING: (ui.ICON_PROCESSING, False, ui.ICON_RESTART, True, False),
+        }
+        self._pp_icons = (ui.ICON_PP_OFF, ui.ICON_PP_ON)
+
+        # Окно впервые показывается после определения монитора (см. _handle_monitor_state_change)
+        self._shown_once = False
+
+        # Отложенный MonitorChanged (debounce серии событий hotplug)
+        self._pending_monitor_name: Optional[str] = None
+        self._monitor_source_id: Optional[int] = None
 
         # Подписываемся на изменения состояния
         self.store.subscribe(self._render_state)
@@ -1990,16 +3007,28 @@ class RecognitionWindow:
         monitor_manager = MonitorManager(config=config)
 
         # Путь к файлу настроек
-        settings_file = os.path.expanduser("~/.config/float-speech-to-text/settings.json")
+        settings_file = str(_APP_CONFIG_DIR / "settings.json")
 
         # Загружаем сохранённые настройки
         saved_settings = SettingsPersistenceEffect.load_settings(settings_file)
 
+        # Кеш результатов LLM
+        llm_cache = None
+        if config.settings.LLM_CACHE_ENABLED:
+            if config.settings.LLM_TEMPERATURE != 0:
+                log(f"⚠️  Кеш LLM включён при температуре {config.settings.LLM_TEMPERATURE}: "
+                    f"для каждой фразы будет переиспользоваться один случайный ответ", level=WARNING)
+            llm_cache = LLMCache(
+                str(_APP_CONFIG_DIR / "llm_cache.json"),
+                model_id=config.settings.OPENAI_MODEL,
+                temperature=config.settings.LLM_TEMPERATURE
+            )
+
         # Создаём эффекты (включаем SettingsPersistenceEffect и WindowPersistenceEffect)
         effects = [
             StartRecordingEffect(speech),
             ASREffect(speech, AsyncTaskRunner),
-            LLMEffect(post_processing, AsyncTaskRunner),
+            LLMEffect(post_processing, AsyncTaskRunner, llm_cache),
             FinalizeEffect(clipboard, paste, GLib, config),
             RestartEffect(speech, AsyncTaskRunner, AppSettings.RESTART_DELAY_SEC),
             SettingsPersistenceEffect(settings_file),
@@ -2022,7 +3051,18 @@ class RecognitionWindow:
         # Создаём хранилище
         store = Store(initial_state, Reducer.reduce, effects)
 
-        return cls(config, store, monitor_manager=monitor_manager)
+        return cls(config, store, monitor_manager=monitor_manager, post_processing=post_processing)
+
+    def shutdown(self):
+        """
+        Освобождает фоновые ресурсы после выхода из главного цикла
+
+        Без этого интерпретатор при завершении ждёт потоки пула, пока не закончится
+        текущий запрос к LLM (с таймаутом и повторами - до нескольких минут).
+        """
+        if self.post_processing is not None:
+            self.post_processing.close()
+        AsyncTaskRunner.shutdown()
 
     def _update_record_button(self, label: str, is_sensitive: bool = True):
         """
@@ -2035,8 +3075,17 @@ class RecognitionWindow:
         if not self.button:
             return
 
-        self.button.set_label(label)
-        self.button.set_sensitive(is_sensitive)
+        prev = self._record_button_ui or (None, None)
+        if prev == (label, is_sensitive):
+            return
+        self._record_button_ui = (label, is_sensitive)
+
+        # Метка и чувствительность меняются независимо (RECORDING -> PROCESSING меняет обе,
+        # PROCESSING -> POST_PROCESSING - ни одну): вызываем только то, что изменилось
+        if label != prev[0]:
+            self.button.set_label(label)
+        if is_sensitive != prev[1]:
+            self.button.set_sensitive(is_sensitive)
 
     def _update_restart_button(self, label: str, is_restart: bool, is_sensitive: bool = True):
         """
@@ -2050,41 +3099,40 @@ class RecognitionWindow:
         if not self.restart_button:
             return
 
-        self.restart_button.set_label(label)
-        self.restart_button.set_sensitive(is_sensitive)
-
-        # Переключаем CSS класс
-        style_context = self.restart_button.get_style_context()
-        if is_restart:
-            style_context.remove_class("close-button")
-            style_context.add_class("restart-button")
-        else:
-            style_context.remove_class("restart-button")
-            style_context.add_class("close-button")
+        prev = self._restart_button_ui or (None, None, None)
+        if prev == (label, is_restart, is_sensitive):
+            return
+        self._restart_button_ui = (label, is_restart, is_sensitive)
+
+        # Каждое свойство меняем только если оно отличается: замена CSS класса
+        # запускает пересчёт стилей, даже если набор классов в итоге тот же
+        if label != prev[0]:
+            self.restart_button.set_label(label)
+        if is_sensitive != prev[2]:
+            self.restart_button.set_sensitive(is_sensitive)
+
+        if is_restart != prev[1]:
+            ui = self._ui
+            if is_restart:
+                self._restart_ctx.remove_class(ui.CSS_CLASS_CLOSE)
+                self._restart_ctx.add_class(ui.CSS_CLASS_RESTART)
+            else:
+                self._restart_ctx.remove_class(ui.CSS_CLASS_RESTART)
+                self._restart_ctx.add_class(ui.CSS_CLASS_CLOSE)
 
     def _render_state(self, state: State):
         """Redux subscriber - обновляет UI на основе текущего состояния"""
         # 1. Обновляем состояние кнопок на основе фазы
-        if state.phase == Phase.IDLE:
-            self._update_record_button(self.config.ui.ICON_RECORD, is_sensitive=True)
-            self._update_restart_button(self.config.ui.ICON_CLOSE, is_restart=False, is_sensitive=True)
-
-        elif state.phase == Phase.RECORDING:
-            self._update_record_button(self.config.ui.ICON_STOP, is_sensitive=True)
-            self._update_restart_button(self.config.ui.ICON_RESTART, is_restart=True, is_sensitive=True)
-
-        elif state.phase in (Phase.PROCESSING, Phase.POST_PROCESSING):
-            self._update_record_button(self.config.ui.ICON_PROCESSING, is_sensitive=False)
-            self._update_restart_button(self.config.ui.ICON_CLOSE, is_restart=False, is_sensitive=False)
-
-        elif state.phase == Phase.RESTARTING:
-            self._update_record_button(self.config.ui.ICON_PROCESSING, is_sensitive=False)
-            self._update_restart_button(self.config.ui.ICON_RESTART, is_restart=True, is_sensitive=False)
+        phase_ui = self._phase_ui.get(state.phase)
+        if phase_ui is not None:
+            record_label, record_sensitive, restart_label, is_restart, restart_sensitive = phase_ui
+            self._update_record_button(record_label, is_sensitive=record_sensitive)
+            self._update_restart_button(restart_label, is_restart=is_restart, is_sensitive=restart_sensitive)
 
         # 2. Обновляем кнопку PP button
-        if self.pp_button:
-            icon = self.config.ui.ICON_PP_ON if state.llm_enabled else self.config.ui.ICON_PP_OFF
-            self.pp_button.set_label(icon)
+        if self.pp_button and state.llm_enabled != self._last_llm_enabled:
+            self._last_llm_enabled = state.llm_enabled
+            self.pp_button.set_label(self._pp_icons[state.llm_enabled])
 
         # 3. Обновляем позицию на основе относительных координат из состояния
         if not self.is_dragging and state.current_monitor_name and self.window:
@@ -2099,23 +3147,25 @@ class RecognitionWindow:
                 if margin_right != self.current_margin_x or margin_top != self.current_margin_y:
                     self.current_margin_x = margin_right
                     self.current_margin_y = margin_top
-                    GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.TOP, int(margin_top))
-                    GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.RIGHT, int(margin_right))
-                    log(f"📐 Render: Окно позиционировано ({margin_right}, {margin_top}) на {state.current_monitor_name}")
+                    self._apply_margins(margin_top, margin_right)
+                    log("📐 Render: Окно позиционировано (%s, %s) на %s",
+                        margin_right, margin_top, state.current_monitor_name, level=DEBUG)
 
 
     def on_button_press(self, _widget, event):
         """Обработчик начала перетаскивания"""
-        if event.button == self.config.ui.MOUSE_BUTTON_LEFT:
-            self.is_dragging = True
+        if event.button == self._ui.MOUSE_BUTTON_LEFT:
+            # Перетаскивание начнётся только после выхода за DRAG_THRESHOLD_PX
+            self._drag_armed = True
             self.was_moved = False  # Флаг фактического перемещения
-            self.drag_start_x = event.x_root
-            self.drag_start_y = event.y_root
+            self.drag_start_x = int(event.x_root)
+            self.drag_start_y = int(event.y_root)
 
     def on_button_release(self, _widget, event):
         """Обработчик окончания перетаскивания"""
-        if event.button == self.config.ui.MOUSE_BUTTON_LEFT:
+        if event.button == self._ui.MOUSE_BUTTON_LEFT:
             self.is_dragging = False
+            self._drag_armed = False
             # Сохраняем позицию только если окно действительно перемещалось
             if self.was_moved:
                 monitor = self.monitor_manager.get_monitor_at_cursor()
@@ -2138,28 +3188,78 @@ class RecognitionWindow:
 
     def on_motion_notify(self, _widget, event):
         """Обработчик перемещения мыши при перетаскивании"""
-        if self.is_dragging:
-            # Вычисляем смещение
-            dx = event.x_root - self.drag_start_x
-            dy = event.y_root - self.drag_start_y
+        # Снимок координат: каждое обращение к полю события — маршалинг PyGObject.
+        # Координаты сразу целые, поэтому отступы остаются int без конвертаций на кадре
+        x = int(event.x_root)
+        y = int(event.y_root)
+        dx = x - self.drag_start_x
+        dy = y - self.drag_start_y
+        # Нулевые (в т.ч. субпиксельные после округления) смещения тачпада ничего не двигают
+        if not dx and not dy:
+            return
 
-            # Обновляем позицию (кеш)
-            # Инвертируем dx, так как окно привязано к правому краю
-            self.current_margin_x -= dx
-            self.current_margin_y += dy
-            self.was_moved = True
+        if not self.is_dragging:
+            if not self._drag_armed:
+                return
+            # Гистерезис: дрожание руки при клике не двигает окно (сравнение квадратов, без sqrt)
+            if dx * dx + dy * dy < self._drag_threshold_sq:
+                return
+            self.is_dragging = True
 
-            # Плавное обновление через margins (без Redux для производительности драга)
-            GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.TOP, int(self.current_margin_y))
-            GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.RIGHT, int(self.current_margin_x))
+        # Обновляем позицию (кеш)
+        # Инвертируем dx, так как окно привязано к правому краю
+        self.current_margin_x -= dx
+        self.current_margin_y += dy
+        self.was_moved = True
+
+        # Плавное обновление через margins (без Redux для производительности драга):
+        # события мыши приходят чаще кадров, поэтому применяем отступы на следующем кадре
+        if self._motion_tick_id is None:
+            self._motion_tick_id = self.window.add_tick_callback(self._flush_margins)
+
+        # Обновляем начальную позицию для следующего движения
+        self.drag_start_x = x
+        self.drag_start_y = y
+
+    def _flush_margins(self, _widget, _frame_clock) -> bool:
+        """Применяет накопленные за кадр отступы перетаскивания (tick callback)"""
+        self._motion_tick_id = None
+        self._apply_margins(self.current_margin_y, self.current_margin_x)
+        return GLib.SOURCE_REMOVE
+
+    def _apply_margins(self, top: int, right: int):
+        """Устанавливает оба отступа layer shell одним обновлением окна"""
+        # Пока обновления GdkWindow заморожены, два set_margin дают одну перерисовку
+        # и один commit поверхности вместо двух
+        gdk_window = self.window.get_window()
+        if gdk_window is None:
+            GtkLayerShell.set_margin(self.window, _EDGE_TOP, top)
+            GtkLayerShell.set_margin(self.window, _EDGE_RIGHT, right)
+            return
+        gdk_window.freeze_updates()
+        try:
+            GtkLayerShell.set_margin(self.window, _EDGE_TOP, top)
+            GtkLayerShell.set_margin(self.window, _EDGE_RIGHT, right)
+        finally:
+            gdk_window.thaw_updates()
 
-            # Обновляем начальную позицию для следующего движения
-            self.drag_start_x = event.x_root
-            self.drag_start_y = event.y_root
+    def _is_repeat_click(self, name: str) -> bool:
+        """
+        Проверяет, что нажатие пришло слишком быстро после предыдущего нажатия той же кнопки
 
+        Иначе двойной клик превращается в два действия: старт и сразу стоп записи,
+        или перезапуск и следом закрытие приложения (фаза уже не RECORDING).
+        """
+        now = time.monotonic()
+        if now - self._last_click.get(name, float('-inf')) < self._ui.CLICK_COALESCE_SEC:
+            return True
+        self._last_click[name] = now
+        return False
 
     def on_restart_clicked(self, button):
         """Обработчик нажатия кнопки перезапуска/закрытия"""
+        if self._is_repeat_click('restart'):
+            return
         if self.store.state.phase == Phase.RECORDING:
             # Если идёт запись - диспатчим перезапуск
             self.store.dispatch(UIRestart())
@@ -2171,6 +3271,8 @@ class RecognitionWindow:
 
     def on_pp_clicked(self, button):
         """Обработчик нажатия кнопки пост-обработки"""
+        if self._is_repeat_click('pp'):
+            return
         # Переключаем состояние пост-обработки через action
         self.store.dispatch(UIToggleLLM())
 
@@ -2181,11 +3283,9 @@ class RecognitionWindow:
 
     def _setup_css_styles(self, screen):
         """Настраивает CSS стили для окна"""
-        css_provider = Gtk.CssProvider()
-        css_provider.load_from_data(self.config.ui.CSS_STYLES)
         Gtk.StyleContext.add_provider_for_screen(
             screen,
-            css_provider,
+            self.config.ui.get_css_provider(),
             Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
         )
 
@@ -2203,57 +3303,60 @@ class RecognitionWindow:
         GtkLayerShell.init_for_window(self.window)
 
         # Привязываем к верхнему правому углу
-        GtkLayerShell.set_anchor(self.window, GtkLayerShell.Edge.TOP, True)
-        GtkLayerShell.set_anchor(self.window, GtkLayerShell.Edge.RIGHT, True)
+        GtkLayerShell.set_anchor(self.window, _EDGE_TOP, True)
+        GtkLayerShell.set_anchor(self.window, _EDGE_RIGHT, True)
 
         # Устанавливаем отступы из сохранённой позиции
-        GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.TOP, int(self.current_margin_y))
-        GtkLayerShell.set_margin(self.window, GtkLayerShell.Edge.RIGHT, int(self.current_margin_x))
+        self._apply_margins(self.current_margin_y, self.current_margin_x)
 
         # Устанавливаем слой поверх всего
         GtkLayerShell.set_layer(self.window, GtkLayerShell.Layer.OVERLAY)
 
     def _setup_drag_and_drop(self):
         """Настраивает обработчики для drag-and-drop"""
-        self.window.add_events(Gdk.EventMask.BUTTON_PRESS_MASK |
-                              Gdk.EventMask.BUTTON_RELEASE_MASK |
-                              Gdk.EventMask.POINTER_MOTION_MASK)
+        self.window.add_events(_DRAG_EVENT_MASK)
         self.window.connect("button-press-event", self.on_button_press)
         self.window.connect("button-release-event", self.on_button_release)
         self.window.connect("motion-notify-event", self.on_motion_notify)
+        self.window.connect("realize", self._on_realize)
+
+    def _on_realize(self, _widget):
+        """Настраивает GdkWindow после его создания"""
+        # GTK3 сжимает очередь motion-событий по умолчанию, но включаем явно:
+        # обработчик перетаскивания получает только последнее событие из пачки
+        self.window.get_window().set_event_compression(True)
 
     def _create_ui_elements(self, app):
         """Создаёт UI элементы (кнопки)"""
+        # Единое свойство margin задаёт все четыре отступа одним вызовом (одна перекомпоновка)
         box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=self.config.ui.BOX_SPACING)
-        box.set_margin_top(self.config.ui.BOX_MARGIN)
-        box.set_margin_bottom(self.config.ui.BOX_MARGIN)
-        box.set_margin_start(self.config.ui.BOX_MARGIN)
-        box.set_margin_end(self.config.ui.BOX_MARGIN)
+        box.set_property('margin', self.config.ui.BOX_MARGIN)
+
+        ui = self._ui
 
         # Кнопка перезапуска записи (изначально показываем закрытие)
-        self.restart_button = Gtk.Button(label=self.config.ui.ICON_CLOSE)
-        self.restart_button.get_style_context().add_class("close-button")
+        self.restart_button = Gtk.Button.new_with_label(ui.ICON_CLOSE)
+        # Style context принадлежит виджету всё время его жизни - берём его один раз
+        self._restart_ctx = self.restart_button.get_style_context()
+        self._restart_ctx.add_class(ui.CSS_CLASS_CLOSE)
         self.restart_button.connect("clicked", self.on_restart_clicked)
 
         # Кнопка записи
-        self.button = Gtk.Button(label=self.config.ui.ICON_RECORD)
-        self.button.get_style_context().add_class("record-button")
+        self.button = Gtk.Button.new_with_label(ui.ICON_RECORD)
+        self.button.get_style_context().add_class(ui.CSS_CLASS_RECORD)
         self.button.connect("clicked", self.on_button_clicked)
 
         # Кнопка пост-обработки
-        initial_pp_icon = (self.config.ui.ICON_PP_ON
-                                 if self.config.settings.LLM_ENABLED
-                                 else self.config.ui.ICON_PP_OFF)
-        self.pp_button = Gtk.Button(label=initial_pp_icon)
-        self.pp_button.get_style_context().add_class("autopaste-button") # Сохраняем старый класс для стилей
+        initial_pp_icon = self._pp_icons[self.config.settings.LLM_ENABLED]
+        self.pp_button = Gtk.Button.new_with_label(initial_pp_icon)
+        self.pp_button.get_style_context().add_class(ui.CSS_CLASS_PP) # Сохраняем старый класс для стилей
         self.pp_button.connect("clicked", self.on_pp_clicked)
 
         # Сохраняем ссылку на app для возможности закрытия приложения
         self.app = app
 
-        box.add(self.restart_button)
-        box.add(self.button)
-        box.add(self.pp_button)
+        for button in (self.restart_button, self.button, self.pp_button):
+            box.add(button)
 
         return box
 
@@ -2261,6 +3364,8 @@ class RecognitionWindow:
 
     def on_button_clicked(self, button):
         """Обработчик нажатия кнопки"""
+        if self._is_repeat_click('record'):
+            return
         st = self.store.state
         if st.phase == Phase.IDLE:
             # Начинаем запись через dispatch
@@ -2304,14 +3409,17 @@ class RecognitionWindow:
         box = self._create_ui_elements(app)
 
         self.window.add(box)
-        self.window.show_all()
+        # Само окно показывает _handle_monitor_state_change, когда монитор известен:
+        # отступы выставляются до первого показа, и окно не перескакивает
+        # из позиции по умолчанию в сохранённую
+        box.show_all()
 
         # Запускаем мониторинг изменений дисплеев
         display = self.window.get_display()
         self.monitor_manager.start_monitoring(display, self._handle_monitor_state_change)
 
-        # Запускаем первичную проверку монитора (с использованием внутренней логики ретраев)
-        # Это гарантирует, что если монитор не готов при запуске, он будет найден через ретраи.
+        # Запускаем первичную проверку монитора (с ожиданием готовности через notify)
+        # Это гарантирует, что если монитор не готов при запуске, он будет найден, когда GDK обновит его свойства.
         self.monitor_manager._handle_monitor_event(display)
 
         log(f"✅ Окно инициализировано")
@@ -2319,20 +3427,65 @@ class RecognitionWindow:
     def _handle_monitor_state_change(self, monitor: Optional[Gdk.Monitor]):
         """Обработчик стабильного изменения состояния мониторов"""
         if not monitor:
-            log("⚠️  Нет доступных или готовых мониторов. Скрываем окно.")
+            self._cancel_pending_monitor()
+            if not self._shown_once:
+                # При старте монитор так и не определился: показываем окно в позиции
+                # по умолчанию, иначе оно не появилось бы вовсе
+                log("⚠️  Монитор не определён при запуске. Показываем окно в позиции по умолчанию.", level=WARNING)
+                self._shown_once = True
+                self.window.show_all()
+                return
+            log("⚠️  Нет доступных или готовых мониторов. Скрываем окно.", level=WARNING)
             self.window.hide()
             return
 
         monitor_name = self.monitor_manager.get_monitor_identifier(monitor)
         log(f"📺 Монитор для окна: {monitor_name}")
 
-        # Показываем окно если было скрыто
+        # Показываем окно если было скрыто - сразу в сохранённой для монитора позиции
         if not self.window.get_visible():
+            self._place_on_monitor(monitor, monitor_name)
+            self._shown_once = True
             self.window.show_all()
 
-        # Загружаем позицию ПЕРЕД диспатчем, чтобы передать её в MonitorChanged
+        # Серия событий (hotplug, поворот) схлопывается в один MonitorChanged
+        self._pending_monitor_name = monitor_name
+        if self._monitor_source_id is None:
+            self._monitor_source_id = GLib.timeout_add(
+                self.config.ui.MONITOR_DEBOUNCE_MS,
+                self._flush_monitor_change
+            )
+
+    def _place_on_monitor(self, monitor: Gdk.Monitor, monitor_name: str):
+        """Выставляет отступы скрытого окна по сохранённой позиции до его показа"""
         rel_x, rel_y = WindowPositionPersistence.load_position(monitor_name)
-        self.store.dispatch(MonitorChanged(monitor_name=monitor_name, rel_x=rel_x, rel_y=rel_y))
+        window_width, window_height = self._get_window_size()
+        margin_right, margin_top = self.monitor_manager.calculate_absolute_position(
+            rel_x, rel_y, window_width, window_height, monitor
+        )
+        self.current_margin_x = margin_right
+        self.current_margin_y = margin_top
+        self._apply_margins(margin_top, margin_right)
+
+    def _flush_monitor_change(self) -> bool:
+        """Отправляет последний MonitorChanged после окна debounce"""
+        self._monitor_source_id = None
+        monitor_name = self._pending_monitor_name
+        self._pending_monitor_name = None
+
+        if monitor_name is not None:
+            # Загружаем позицию ПЕРЕД диспатчем, чтобы передать её в MonitorChanged
+            rel_x, rel_y = WindowPositionPersistence.load_position(monitor_name)
+            self.store.dispatch(MonitorChanged(monitor_name=monitor_name, rel_x=rel_x, rel_y=rel_y))
+
+        return GLib.SOURCE_REMOVE
+
+    def _cancel_pending_monitor(self):
+        """Отменяет ещё не отправленный MonitorChanged"""
+        if self._monitor_source_id is not None:
+            GLib.source_remove(self._monitor_source_id)
+            self._monitor_source_id = None
+        self._pending_monitor_name = None
 
 
 
@@ -2345,27 +3498,38 @@ def main():
     app = Gtk.Application(application_id=AppConfig.settings.APP_ID)
     app.connect('activate', recognition_window.on_activate)
 
-    # Обработчик Ctrl+C для корректного завершения
-    def signal_handler(_sig, _frame):
-        log("\n⚠️  Получен сигнал прерывания (Ctrl+C)")
+    # Обработчик Ctrl+C для корректного завершения.
+    # GLib.unix_signal_add вызывает его из главного цикла GTK, а не из произвольной точки
+    # исполнения, поэтому dispatch и app.quit() безопасны
+    def quit_app() -> bool:
+        app.quit()
+        return GLib.SOURCE_REMOVE
+
+    def signal_handler(_user_data=None):
+        log("\n⚠️  Получен сигнал прерывания (Ctrl+C)", level=WARNING)
         log("🛑 Останавливаю приложение...")
+        _flush_log()
 
-        # Если идёт запись, диспатчим остановку
+        # Если идёт запись, диспатчим остановку и даём время на обработку (не блокируя цикл)
         if recognition_window.store.state.phase == Phase.RECORDING:
             recognition_window.store.dispatch(UIStop())
-            # Даем время на обработку
-            time.sleep(0.5)
+            GLib.timeout_add(500, quit_app)
+        else:
+            app.quit()
 
-        # Завершаем приложение
-        app.quit()
-        sys.exit(0)
+        # Повторный сигнал обработается по умолчанию (немедленное завершение)
+        return GLib.SOURCE_REMOVE
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGINT, signal_handler, None)
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGTERM, signal_handler, None)
 
     log("💡 Нажмите Ctrl+C для выхода")
 
+    # Буферизация включается только из уже работающего главного цикла
+    GLib.idle_add(_set_log_buffering, True)
     app.run(None)
+    recognition_window.shutdown()
+    _set_log_buffering(False)
 
 
 